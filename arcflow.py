@@ -0,0 +1,204 @@
+from master import glpk, glpkLimits, pymprog
+from math import gcd
+import pricing
+from startup import lazyImport
+
+np = lazyImport('numpy')
+
+
+class ArcFlowGraph:
+    '''Valerio de Carvalho's arc-flow graph of a cutting-stock instance, compressed.
+
+    Nodes are used lengths of the stock and an arc (i, tail, head) cuts one
+    piece of type i, so every path from the source to the sink is a pattern.
+    Only arcs reachable with the longer pieces laid out first are built, and
+    while it is built no path cuts more pieces of a type than are ordered.
+    The graph is then compressed (Brandao and Pedroso): every node is
+    relabelled with the latest position its pieces can be pushed to, and
+    nodes with the same label are merged. Merging joins paths, so afterwards
+    a path may cut more of a type than was ordered, and it is the demand
+    rows of the model that enforce the orders. Loss arcs (i = None) lead
+    from every node to the sink.
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length):
+        n = len(piece_sizes)
+        g = 0
+        for size in piece_sizes:
+            g = gcd(g, size)
+        cap = stock_length // g
+        self.scale = g
+
+        # item arcs of the uncompressed graph, in canonical order
+        reachable = np.zeros(cap + 1, dtype=bool)
+        reachable[0] = True
+        tails = {}
+        for i in pricing.canonicalOrder(piece_sizes):
+            w = piece_sizes[i] // g
+            copies = min(piece_amounts[i], cap // w)
+            if copies <= 0:
+                continue
+            used = np.zeros(cap + 1, dtype=bool)
+            frontier = reachable.copy()
+            for _ in range(copies):
+                frontier[cap - w + 1:] = False
+                if not frontier.any():
+                    break
+                used |= frontier
+                frontier = np.roll(frontier, w)
+                reachable |= frontier
+            tails[i] = np.nonzero(used)[0]
+        self.original_nodes = int(reachable.sum()) + (0 if reachable[cap] else 1)
+        self.original_arcs = sum(len(t) for t in tails.values())
+
+        # compression: a node's label is the smallest of (label of the head -
+        # piece length) over its arcs, or the stock length without arcs
+        out = {}
+        for i, t in tails.items():
+            w = piece_sizes[i] // g
+            for u in t.tolist():
+                out.setdefault(u, []).append((i, w))
+        label = {}
+        for u in sorted(np.nonzero(reachable)[0].tolist(), reverse=True):
+            arcs = out.get(u)
+            label[u] = min(label[u + w] - w for _, w in arcs) if arcs else cap
+
+        arcs = set()
+        for u, items in out.items():
+            for i, w in items:
+                arcs.add((i, label[u], label[u + w]))
+        self.source = label[0]
+        self.sink = cap
+        self.nodes = sorted(set(label.values()) | set([cap]))
+        self.arcs = sorted(arcs)
+        self.arcs += [(None, u, cap) for u in self.nodes if u != cap]
+        self.piece_count = n
+
+    def itemArcs(self):
+        return sum(1 for arc in self.arcs if arc[0] is not None)
+
+
+def arcFlowProblem(graph, piece_amounts):
+    '''The arc-flow IP over an ArcFlowGraph as data: (entries, lower, upper, costs).
+
+    entries are the (row, column, value) non-zeros, lower and upper the row
+    bounds (None for an open side) and costs the objective per arc: one >=
+    row per piece type (the flow on its arcs), one == 0 flow conservation
+    row per inner node, and a cost of 1 on the arcs out of the source. Every
+    backend (see backends.py) loads the same data.
+    '''
+    n = len(piece_amounts)
+    inner = [u for u in graph.nodes if u != graph.source and u != graph.sink]
+    row_of = {u: n + k for k, u in enumerate(inner)}
+    lower = [float(amount) for amount in piece_amounts] + [0.0] * len(inner)
+    upper = [None] * n + [0.0] * len(inner)
+    entries = []
+    costs = []
+    for j, (i, tail, head) in enumerate(graph.arcs):
+        if i is not None:
+            entries.append((i, j, 1.0))
+        if tail in row_of:
+            entries.append((row_of[tail], j, -1.0))
+        if head in row_of:
+            entries.append((row_of[head], j, 1.0))
+        costs.append(1.0 if tail == graph.source else 0.0)
+    return entries, lower, upper, costs
+
+
+class ArcFlowModel:
+    '''The arc-flow IP over an ArcFlowGraph: minimize the flow out of the source.
+
+    One >= row per piece type (the flow on its arcs) and one flow
+    conservation row per inner node; the whole matrix is loaded in one call.
+    '''
+    def __init__(self, graph, piece_amounts, name='cutting-stock-arcflow'):
+        self.graph = graph
+        self.model = pymprog.model(name)
+        self.model.set_obj_dir(glpk.GLP_MIN)
+
+        entries, lower, upper, costs = arcFlowProblem(graph, piece_amounts)
+        self.model.add_rows(len(lower))
+        for i, (lo, hi) in enumerate(zip(lower, upper)):
+            self.model.set_row_bnds(i + 1, glpk.GLP_LO if hi is None else glpk.GLP_FX, lo, lo)
+
+        self.columns = len(costs)
+        self.model.add_cols(self.columns)
+        for j, cost in enumerate(costs):
+            self.model.set_col_bnds(j + 1, glpk.GLP_LO, 0, 0)
+            if cost:
+                self.model.set_obj_coef(j + 1, cost)
+
+        ia = glpk.intArray(len(entries) + 1)
+        ja = glpk.intArray(len(entries) + 1)
+        ar = glpk.doubleArray(len(entries) + 1)
+        for t, (i, j, a) in enumerate(entries):
+            ia[t + 1] = i + 1
+            ja[t + 1] = j + 1
+            ar[t + 1] = a
+        self.model.load_matrix(len(entries), ia, ja, ar)
+        self.rows = len(lower)
+        self.nonzeros = len(entries)
+        self.integer = False
+        self.returned = None
+
+    def solveLP(self, timeLimit=None):
+        glpkLimits(self.model, float, timeLimit)
+        self.returned = self.model.solve(float)[0]
+        return self.model.vobj()
+
+    def solveIP(self, timeLimit=None, gap=None):
+        for j in range(1, self.columns + 1):
+            self.model.set_col_kind(j, glpk.GLP_IV)
+        self.integer = True
+        glpkLimits(self.model, int, timeLimit, gap)
+        self.returned = self.model.solve(int)[0]
+        return self.model.vobj()
+
+    def timedOut(self):
+        return self.returned == glpk.GLP_ETMLIM
+
+    def feasible(self):
+        if self.integer:
+            return self.model.mip_status() in (glpk.GLP_OPT, glpk.GLP_FEAS)
+        return self.model.get_status() in (glpk.GLP_OPT, glpk.GLP_FEAS)
+
+    def flows(self):
+        if self.integer:
+            return [self.model.mip_col_val(j + 1) for j in range(self.columns)]
+        return [self.model.get_col_prim(j + 1) for j in range(self.columns)]
+
+    def end(self):
+        self.model.end()
+
+
+def decodeFlows(graph, flows):
+    '''Split an integral flow into source-sink paths; returns ([pattern, ...], [count, ...]).'''
+    remaining = {}
+    outgoing = {}
+    for (i, tail, head), f in zip(graph.arcs, flows):
+        f = int(round(f))
+        if f > 0:
+            remaining[(i, tail, head)] = f
+            outgoing.setdefault(tail, []).append((i, tail, head))
+
+    counts = {}
+    while True:
+        arcs = [arc for arc in outgoing.get(graph.source, []) if remaining[arc]]
+        if not arcs:
+            break
+        # take as many stock pieces as the whole path can carry at once
+        path = []
+        node = graph.source
+        while node != graph.sink:
+            arc = next(arc for arc in outgoing[node] if remaining[arc])
+            path.append(arc)
+            node = arc[2]
+        amount = min(remaining[arc] for arc in path)
+        pattern = [0] * graph.piece_count
+        for arc in path:
+            remaining[arc] -= amount
+            if arc[0] is not None:
+                pattern[arc[0]] += 1
+        if any(pattern):
+            counts[tuple(pattern)] = counts.get(tuple(pattern), 0) + amount
+
+    return [list(pattern) for pattern in counts], list(counts.values())
@@ -0,0 +1,37 @@
+import importlib.util
+
+
+# LP/MIP engines the models can be solved with; GLPK (through pymprog) is
+# the default, HiGHS comes with scipy (1.9 or later for its MIP)
+BACKENDS = ('glpk', 'highs')
+
+
+def available(backend):
+    '''Whether the library `backend` needs is installed (without importing it).'''
+    return importlib.util.find_spec('scipy' if backend == 'highs' else 'pymprog') is not None
+
+
+def checkBackend(backend):
+    '''Raise ValueError unless `backend` is known and its library is installed.'''
+    if backend not in BACKENDS:
+        raise ValueError(f'unknown backend {backend!r}, expected one of {", ".join(BACKENDS)}')
+    if not available(backend):
+        raise ValueError(f'the {backend} backend needs {"scipy" if backend == "highs" else "pymprog"}')
+
+
+def masterProblem(backend, piece_amounts, tight=False):
+    '''A restricted master problem (see master.MasterProblem) solved by `backend`.'''
+    if backend == 'highs':
+        import highs
+        return highs.MasterProblem(piece_amounts, tight=tight)
+    from master import MasterProblem
+    return MasterProblem(piece_amounts, tight=tight)
+
+
+def arcFlowModel(backend, graph, piece_amounts):
+    '''The arc-flow IP of an arcflow.ArcFlowGraph (see arcflow.ArcFlowModel) solved by `backend`.'''
+    if backend == 'highs':
+        import highs
+        return highs.ArcFlowModel(graph, piece_amounts)
+    from arcflow import ArcFlowModel
+    return ArcFlowModel(graph, piece_amounts)
@@ -0,0 +1,313 @@
+import argparse
+import csv
+import json
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import re
+import sys
+from time import time
+
+from backends import BACKENDS
+from stock import Stock
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# exit codes, meant for schedulers
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_TIMEOUT = 3
+
+
+class Job:
+    def __init__(self, name, piece_sizes, piece_amounts, stock_length, method=None):
+        self.name = name
+        self.piece_sizes = piece_sizes
+        self.piece_amounts = piece_amounts
+        self.stock_length = stock_length
+        self.method = method
+
+
+def parseJob(name, data, stock_length=None):
+    '''Build a Job from a decoded JSON object.
+
+    Accepted keys: "stock_length" and either "orders" (a list of [length, amount]
+    pairs or of {"length": .., "amount": ..} objects) or parallel "sizes" and
+    "amounts" lists. "id" and "method" are optional. Instead of "stock_length"
+    a "stock" catalogue may be given, a list of {"length": .., "cost": ..,
+    "available": ..} objects or [length, cost, available] lists.
+    '''
+    if 'orders' in data:
+        piece_sizes = []
+        piece_amounts = []
+        for order in data['orders']:
+            if isinstance(order, dict):
+                order = (order['length'], order['amount'])
+            piece_sizes.append(int(order[0]))
+            piece_amounts.append(int(order[1]))
+    else:
+        piece_sizes = [int(s) for s in data['sizes']]
+        piece_amounts = [int(a) for a in data['amounts']]
+
+    if 'stock' in data:
+        stock_length = [Stock.fromDict(entry) for entry in data['stock']]
+    else:
+        stock_length = data.get('stock_length', stock_length)
+        if stock_length is None:
+            raise ValueError('no stock length given')
+        stock_length = int(stock_length)
+
+    return Job(str(data.get('id', name)), piece_sizes, piece_amounts, stock_length, data.get('method'))
+
+
+def readCsvJob(path, stock_length=None):
+    '''A CSV job has "length" and "amount" columns and optionally a "stock_length" column.'''
+    piece_sizes = []
+    piece_amounts = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('stock_length'):
+                stock_length = row['stock_length']
+            piece_sizes.append(int(row['length']))
+            piece_amounts.append(int(row['amount']))
+
+    if stock_length is None:
+        raise ValueError('no stock length given')
+
+    return Job(os.path.splitext(os.path.basename(path))[0], piece_sizes, piece_amounts, int(stock_length))
+
+
+def readJobs(sources, stock_length=None, stream=None):
+    '''Yield (name, Job or exception) for every job in the given files and directories.
+
+    '-' reads one JSON job per line from `stream` (stdin by default).
+    '''
+    for source in sources:
+        if source == '-':
+            for n, line in enumerate(stream or sys.stdin, 1):
+                if not line.strip():
+                    continue
+                name = f'stdin-{n}'
+                try:
+                    job = parseJob(name, json.loads(line), stock_length)
+                    yield job.name, job
+                except (ValueError, KeyError, TypeError, IndexError) as e:
+                    yield name, e
+            continue
+
+        paths = [source]
+        if os.path.isdir(source):
+            paths = sorted(os.path.join(source, f) for f in os.listdir(source) if f.lower().endswith(('.json', '.csv')))
+
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                if path.lower().endswith('.csv'):
+                    job = readCsvJob(path, stock_length)
+                else:
+                    with open(path) as f:
+                        job = parseJob(name, json.load(f), stock_length)
+                yield job.name, job
+            except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+                yield name, e
+
+
+def runJob(job, method, memory_limit, cache_dir, conn, options=None):
+    '''Worker process entry point: solve one job and send back its result dict.
+
+    options are passed on to solver.solve.
+    '''
+    # GLPK writes its log straight to the C-level stdout
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    if memory_limit and resource is not None:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    try:
+        import solver
+        from cache import SolveCache
+        cache = SolveCache(cache_dir) if cache_dir else None
+        result = solver.solve(job.piece_sizes, job.piece_amounts, job.stock_length, job.method or method, cache=cache, **(options or {}))
+        conn.send({'status': 'solved', 'result': result.asDict()})
+    except MemoryError:
+        conn.send({'status': 'memory', 'error': 'memory limit exceeded'})
+    except Exception as e:
+        conn.send({'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+    finally:
+        conn.close()
+
+
+def writeJson(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def resultName(name, taken):
+    '''A result file name for job `name`, safe inside the output directory and not in `taken`.
+
+    Anything but letters, digits, '.', '-' and '_' becomes '_', and a name
+    already taken (compared case-insensitively) gets a -2, -3, ... suffix.
+    The name is added to `taken`.
+    '''
+    safe = re.sub(r'[^\w.-]+', '_', name).strip('.') or 'job'
+    candidate = safe
+    n = 2
+    while candidate.lower() in taken:
+        candidate = f'{safe}-{n}'
+        n += 1
+    taken.add(candidate.lower())
+    return candidate + '.json'
+
+
+def runBatch(jobs, output, method=2, workers=None, timeout=None, memory_limit=None, log=None, cache_dir=None, options=None):
+    '''Solve (name, job) pairs concurrently, each one in its own process.
+
+    Writes <output>/<job>.json for every job (see resultName; the summary
+    entry's "file" names it) plus <output>/summary.json and returns the
+    summary entries. A result that cannot be written fails its job only.
+    options are extra solver.solve keyword arguments for every job.
+    '''
+    os.makedirs(output, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if multiprocessing.get_start_method() == 'fork':
+        # forked workers inherit the solver with numpy and GLPK already loaded
+        import startup
+        startup.preload('solver', *startup.MODEL_MODULES)
+        if options and options.get('backend') == 'highs':
+            startup.preload('highs')
+
+    jobs = iter(jobs)
+    running = {}
+    summary = []
+    taken = {'summary'}
+
+    def finish(name, entry, result=None):
+        entry = dict(job=name, file=resultName(name, taken), **entry)
+        data = dict(entry)
+        if result is not None:
+            data['result'] = result
+        try:
+            writeJson(os.path.join(output, entry['file']), data)
+        except (OSError, TypeError, ValueError) as e:
+            entry.update(status='failed', error=f'cannot write {entry["file"]}: {e}')
+        summary.append(entry)
+        if log:
+            log(f'{name}: {entry["status"]}' + (f' ({entry["error"]})' if entry.get('error') else ''))
+
+    exhausted = False
+    while running or not exhausted:
+        while not exhausted and len(running) < workers:
+            try:
+                name, job = next(jobs)
+            except StopIteration:
+                exhausted = True
+                break
+
+            if isinstance(job, Exception):
+                finish(name, {'status': 'invalid', 'error': str(job)})
+                continue
+
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=runJob, args=(job, method, memory_limit, cache_dir, sender, options), daemon=True)
+            process.start()
+            sender.close()
+            running[process.sentinel] = (name, process, receiver, time())
+
+        if not running:
+            continue
+
+        now = time()
+        wait_for = None
+        if timeout:
+            wait_for = max(0, min(started + timeout for _, _, _, started in running.values()) - now)
+        # results are read as soon as they arrive: a worker blocked on a full
+        # pipe would otherwise never exit
+        ready = wait([c for sentinel, (_, _, receiver, _) in running.items() for c in (sentinel, receiver)], wait_for)
+
+        now = time()
+        for sentinel in list(running):
+            name, process, receiver, started = running[sentinel]
+            message = None
+            if sentinel in ready or receiver in ready:
+                if receiver.poll():
+                    try:
+                        message = receiver.recv()
+                    except EOFError:
+                        pass
+                process.join()
+                if message is None:
+                    message = {'status': 'crashed', 'error': f'worker exited with code {process.exitcode}'}
+            elif timeout and now - started >= timeout:
+                process.terminate()
+                process.join()
+                message = {'status': 'timeout', 'error': f'no solution within {timeout} seconds'}
+            else:
+                continue
+
+            del running[sentinel]
+            receiver.close()
+
+            result = message.pop('result', None)
+            message['seconds'] = round(now - started, 3)
+            if result is not None:
+                message['stock_used'] = result['stock_used']
+                message['objective'] = result['objective']
+                message['lp_bound'] = result['lp_bound']
+            finish(name, message, result)
+
+    summary.sort(key=lambda entry: entry['job'])
+    writeJson(os.path.join(output, 'summary.json'), {'jobs': summary})
+    return summary
+
+
+def exitCode(summary):
+    if not summary:
+        return EXIT_USAGE
+    statuses = set(entry['status'] for entry in summary)
+    if statuses == {'solved'}:
+        return EXIT_OK
+    if statuses <= {'solved', 'timeout'}:
+        return EXIT_TIMEOUT
+    return EXIT_FAILED
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve many cutting-stock jobs in parallel.')
+    parser.add_argument('sources', nargs='+', help="job files (.json/.csv), directories of them, or '-' for JSON lines on stdin")
+    parser.add_argument('-o', '--output', default='results', help='directory for the result files (default: results)')
+    parser.add_argument('-m', '--method', type=int, choices=(1, 2, 3), default=2, help='1: generate all patterns, 2: column generation (default), 3: arc-flow model')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of worker processes (default: number of cores)')
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='per-job time limit in seconds')
+    parser.add_argument('--time-limit', type=float, default=None, help='per-job solver time limit in seconds; the best solution found by then is written')
+    parser.add_argument('--mip-gap', type=float, default=None, help="relative gap at which the IP's branch-and-bound stops")
+    parser.add_argument('--backend', choices=BACKENDS, default='glpk', help='LP/MIP backend: glpk (default) or highs (needs scipy)')
+    parser.add_argument('--memory-limit', type=int, default=None, help='per-worker address space limit in MB')
+    parser.add_argument('--stock-length', type=int, default=None, help='stock length for jobs that do not specify one')
+    parser.add_argument('--cache', default=None, metavar='DIR', help='reuse solutions and pattern pools stored in DIR')
+    parser.add_argument('-b', '--branch-and-price', action='store_true', help='prove optimality with branch-and-price (method 2)')
+    parser.add_argument('--no-presolve', action='store_true', help='model every job as it is, without merging, fixing and scaling its lengths first')
+    parser.add_argument('--profile', action='store_true', help='add cProfile and tracemalloc data to the result files')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not print one line per finished job')
+    args = parser.parse_args(argv)
+
+    jobs = readJobs(args.sources, args.stock_length)
+    log = None if args.quiet else lambda text: print(text, file=sys.stderr)
+    options = {'branchAndPrice': args.branch_and_price, 'profileCode': args.profile, 'traceMemory': args.profile, 'timeLimit': args.time_limit, 'mipGap': args.mip_gap, 'presolve': not args.no_presolve, 'backend': args.backend}
+    summary = runBatch(jobs, args.output, args.method, args.workers, args.timeout, args.memory_limit, log, args.cache, options)
+
+    if not summary:
+        print('no jobs found', file=sys.stderr)
+    return exitCode(summary)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
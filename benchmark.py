@@ -0,0 +1,266 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import platform
+import random
+import sys
+from time import time
+
+from backends import BACKENDS
+import batch
+from stock import isCatalogue
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# the example that showMainScreen starts with
+DEMO = batch.Job('demo', [1380, 1520, 1560, 1710, 1820, 1880, 1930, 2000, 2050, 2100, 2140, 2150, 2200], [22, 25, 12, 14, 18, 18, 20, 10, 12, 14, 16, 18, 20], 5600)
+
+FIELDS = ['instance', 'method', 'backend', 'status', 'stopped_early', 'lengths', 'pieces', 'stock_length', 'patterns', 'iterations', 'objective', 'lp_bound', 'bound', 'gap', 'nodes', 'heuristic',
+          'pattern_seconds', 'enumerate_seconds', 'build_seconds', 'lp_seconds', 'pricing_seconds', 'heuristic_seconds', 'ip_seconds', 'total_seconds', 'seconds', 'peak_memory_mb', 'error']
+
+
+def generateInstance(name, pieces, stock_length=10000, sizes=(0.1, 0.5), demand=10, seed=None):
+    '''Random instance in the style of Gau and Waescher's CUTGEN.
+
+    Piece lengths are drawn uniformly from [sizes[0], sizes[1]] times the stock
+    length (equal lengths are merged) and the total demand of about
+    pieces * demand is spread over them at random.
+    '''
+    rng = random.Random(seed)
+    low = max(1, int(sizes[0] * stock_length))
+    high = max(low, min(stock_length, int(sizes[1] * stock_length)))
+
+    lengths = sorted(set(rng.randint(low, high) for _ in range(pieces)), reverse=True)
+    weights = [rng.random() for _ in lengths]
+    total = pieces * demand
+    amounts = [max(1, round(total * w / sum(weights))) for w in weights]
+    return batch.Job(name, lengths, amounts, stock_length)
+
+
+def readInstance(path):
+    '''Read a classic instance file (BPPLIB / OR-Library layout).
+
+    The first number is the number of items (or item types), the second the
+    stock length (bin capacity), then one line per item: either a single
+    length (bin packing instances, equal lengths are merged) or a length and
+    its demand (cutting-stock instances).
+    '''
+    with open(path) as f:
+        lines = [line.split() for line in f if line.strip()]
+    count = int(float(lines[0][0]))
+    stock_length = int(float(lines[1][0]))
+
+    demand = {}
+    for line in lines[2:2 + count]:
+        size = int(float(line[0]))
+        demand[size] = demand.get(size, 0) + (int(float(line[1])) if len(line) > 1 else 1)
+
+    sizes = sorted(demand, reverse=True)
+    return batch.Job(os.path.splitext(os.path.basename(path))[0], sizes, [demand[s] for s in sizes], stock_length)
+
+
+def readInstances(sources):
+    '''Yield a Job for every instance file in the given files and directories.
+
+    .json and .csv files are read like batch jobs, anything else (.txt, .bpp,
+    ...) as a classic instance file.
+    '''
+    for source in sources:
+        paths = [source]
+        if os.path.isdir(source):
+            paths = sorted(os.path.join(source, f) for f in os.listdir(source) if not f.startswith('.'))
+
+        for path in paths:
+            if path.lower().endswith(('.json', '.csv')):
+                for _, job in batch.readJobs([path]):
+                    if isinstance(job, Exception):
+                        raise ValueError(f'{path}: {job}')
+                    yield job
+            else:
+                try:
+                    yield readInstance(path)
+                except (IndexError, ValueError) as e:
+                    raise ValueError(f'{path}: not an instance file ({e})')
+
+
+def runCase(job, method, options, conn):
+    '''Worker process entry point: solve one instance and send back its measurements.'''
+    # GLPK writes its log straight to the C-level stdout
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    record = {}
+    def progress(event):
+        if event['event'] == 'patterns_generated':
+            record['patterns'] = event['count']
+            record['iterations'] = event.get('iterations')
+
+    try:
+        import solver
+        result = solver.solve(job.piece_sizes, job.piece_amounts, job.stock_length, method, progress=progress, **options)
+        record.update({
+            'status': 'solved',
+            'stopped_early': result.stopped_early,
+            'objective': result.objective,
+            'lp_bound': result.lp_bound,
+            'bound': result.bound,
+            'nodes': result.profile['counters'].get('nodes'),
+            'gap': result.gap(),
+            'heuristic': result.heuristic,
+            'pattern_seconds': result.timings.get('patterns'),
+            'enumerate_seconds': result.timings.get('enumerate'),
+            'build_seconds': result.timings.get('build'),
+            'lp_seconds': result.timings.get('lp'),
+            'pricing_seconds': result.timings.get('pricing'),
+            'heuristic_seconds': result.timings.get('heuristics'),
+            'ip_seconds': result.timings.get('ip'),
+            'total_seconds': result.timings.get('total'),
+        })
+    except MemoryError:
+        record.update({'status': 'memory', 'error': 'memory limit exceeded'})
+    except Exception as e:
+        record.update({'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        record['peak_memory_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    conn.send(record)
+    conn.close()
+
+
+def runCases(jobs, methods=(1, 2, 3), timeout=None, options=None, log=None, backends=('glpk',)):
+    '''Solve every job with every method on every backend, one fresh process per run, and return the records.
+
+    A fresh process keeps the peak memory of one run from leaking into the
+    next. options are extra solver.solve keyword arguments.
+    '''
+    records = []
+    for job in jobs:
+        for method, backend in ((method, backend) for method in methods for backend in backends):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=runCase, args=(job, method, dict(options or {}, backend=backend), sender), daemon=True)
+            started = time()
+            process.start()
+            sender.close()
+
+            record = None
+            if receiver.poll(timeout):
+                try:
+                    record = receiver.recv()
+                except EOFError:
+                    pass
+                process.join()
+                if record is None:
+                    record = {'status': 'crashed', 'error': f'worker exited with code {process.exitcode}'}
+            else:
+                process.terminate()
+                process.join()
+                record = {'status': 'timeout', 'error': f'no solution within {timeout} seconds'}
+            receiver.close()
+
+            record.update({'instance': job.name, 'method': method, 'backend': backend, 'lengths': len(job.piece_sizes), 'pieces': sum(job.piece_amounts),
+                           'stock_length': [stock.length for stock in job.stock_length] if isCatalogue(job.stock_length) else job.stock_length, 'seconds': round(time() - started, 3)})
+            records.append(record)
+            if log:
+                log(f'{job.name} method {method} ({backend}): {record["status"]} ' + (f'Z = {record["objective"]:.0f}, gap {record["gap"]}, {record["seconds"]:.2f}s' if record['status'] == 'solved' else f'({record["error"]})'))
+    return records
+
+
+def compareBackends(records):
+    '''Per method and backend: runs solved to the end, their total seconds and wins.
+
+    A backend wins an instance when it is the fastest to solve it without
+    being stopped early. Run over one class of instances (a directory, or
+    random instances of one shape), this tells which backend to choose for
+    it: {method: {backend: {'solved': .., 'seconds': .., 'wins': ..}}}.
+    '''
+    summary = {}
+    fastest = {}
+    for record in records:
+        entry = summary.setdefault(record['method'], {}).setdefault(record['backend'], {'solved': 0, 'seconds': 0.0, 'wins': 0})
+        if record['status'] == 'solved' and not record.get('stopped_early'):
+            entry['solved'] += 1
+            entry['seconds'] = round(entry['seconds'] + record['seconds'], 3)
+            key = (record['instance'], record['method'])
+            if key not in fastest or record['seconds'] < fastest[key]['seconds']:
+                fastest[key] = record
+    for record in fastest.values():
+        summary[record['method']][record['backend']]['wins'] += 1
+    return summary
+
+
+def writeResults(path, records):
+    '''Write the records as CSV (for .csv paths) or as one JSON document with the run's environment.'''
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            for record in records:
+                writer.writerow({key: record.get(key) for key in FIELDS})
+        return
+
+    batch.writeJson(path, {
+        'created': round(time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'runs': [{key: record.get(key) for key in FIELDS} for record in records],
+        'backends': compareBackends(records),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the cutting-stock solving methods.')
+    parser.add_argument('instances', nargs='*', help='instance files (.json/.csv jobs or classic BPPLIB/OR-Library .txt files) or directories of them')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='results file, .json or .csv (default: benchmark.json)')
+    parser.add_argument('-m', '--methods', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3], help='solving methods to run (default: 1 2 3)')
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='per-run time limit in seconds')
+    parser.add_argument('--time-limit', type=float, default=None, help='solver time limit in seconds; runs stopped by it keep their best solution')
+    parser.add_argument('--no-heuristics', action='store_true', help='always solve the IP')
+    parser.add_argument('--no-presolve', action='store_true', help='model the instances as they are')
+    parser.add_argument('-b', '--branch-and-price', action='store_true', help='prove optimality with branch-and-price (method 2)')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['glpk'], help='LP/MIP backends to run every method on, to compare them (default: glpk)')
+    parser.add_argument('--demo', action='store_true', help='include the example from the GUI')
+    parser.add_argument('-n', '--random', type=int, default=0, metavar='N', help='number of random instances to generate')
+    parser.add_argument('--pieces', type=int, default=20, help='piece lengths per random instance (default: 20)')
+    parser.add_argument('--stock-length', type=int, default=10000, help='stock length of random instances (default: 10000)')
+    parser.add_argument('--sizes', type=float, nargs=2, default=[0.1, 0.5], metavar=('LOW', 'HIGH'), help='piece lengths as fractions of the stock length (default: 0.1 0.5)')
+    parser.add_argument('--demand', type=int, default=10, help='average demand per piece length (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first random instance (default: 0)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not print one line per run')
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = list(readInstances(args.instances))
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return batch.EXIT_USAGE
+    if args.demo:
+        jobs.insert(0, DEMO)
+    for k in range(args.random):
+        seed = args.seed + k
+        jobs.append(generateInstance(f'random-{args.pieces}-{seed}', args.pieces, args.stock_length, args.sizes, args.demand, seed))
+
+    if not jobs:
+        print('no instances given (use --demo, --random N or instance files)', file=sys.stderr)
+        return batch.EXIT_USAGE
+
+    log = None if args.quiet else lambda text: print(text, file=sys.stderr)
+    options = {'useHeuristics': not args.no_heuristics, 'presolve': not args.no_presolve, 'branchAndPrice': args.branch_and_price, 'timeLimit': args.time_limit}
+    records = runCases(jobs, args.methods, args.timeout, options, log, args.backends)
+    writeResults(args.output, records)
+    if log and len(args.backends) > 1:
+        for method, entries in sorted(compareBackends(records).items()):
+            log(f'method {method}: ' + ', '.join(f'{backend} {entry["wins"]} wins, {entry["solved"]} solved in {entry["seconds"]:.2f}s' for backend, entry in entries.items()))
+    return batch.exitCode([{'status': record['status']} for record in records])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
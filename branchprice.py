@@ -0,0 +1,229 @@
+from heapq import heappop, heappush
+from math import ceil, floor
+import backends
+import heuristics
+import pricing
+
+
+EPS = 1e-6
+
+
+def lowerBound(value):
+    return ceil(value - EPS)
+
+
+class Node:
+    '''A branch-and-price subproblem: limits[arc] = (lower, upper) bounds the flow on arc.'''
+    def __init__(self, bound, limits, depth=0):
+        self.bound = bound
+        self.limits = limits
+        self.depth = depth
+
+
+class BranchAndPrice:
+    '''Branch-and-price for the cutting-stock problem with arc-flow branching.
+
+    Every pattern is a path through the arc-flow graph (see
+    pricing.patternArcs). A fractional master solution always has an arc
+    with fractional flow, because integral arc flows decompose into integral
+    paths; branching bounds that flow from above in one child and from below
+    in the other. The bound becomes a row of the master and its dual a value
+    on the arc in pricing, so pricing stays one longest path problem.
+
+    All nodes share one master problem and its column pool: a node only sets
+    the bounds of the arc rows. Nodes are explored best bound first and
+    pruned by the rounded up LP bound and a Lagrangian bound during column
+    generation; an LP rounding heuristic runs at every node. `stop` is
+    called between column generation iterations; once it returns True the
+    search ends with the bound of the open nodes. backend names the LP
+    engine of the master (see backends.py).
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length, patterns, incumbent=None, columns=5, node_limit=None, emit=None, stop=None, backend='glpk'):
+        self.piece_sizes = piece_sizes
+        self.piece_amounts = piece_amounts
+        self.stock_length = stock_length
+        self.columns = columns
+        self.node_limit = node_limit
+        self.emit = emit or (lambda event, message='', **data: None)
+        self.stop = stop or (lambda: False)
+        self.interrupted = False
+        self.nodes = 0
+        self.new_patterns = []
+
+        # artificial columns keep every node LP feasible; a node whose LP
+        # still needs them once no column prices out is infeasible
+        self.master = backends.masterProblem(backend, piece_amounts)
+        self.big = float(sum(piece_amounts) + 1)
+        self.paths = []
+        self.patterns = []
+        for i in range(len(piece_sizes)):
+            self.addArtificial(i)
+
+        self.seen = set()
+        self.arc_rows = {}
+        for pattern in patterns:
+            self.addPattern(pattern)
+        self.new_patterns = []
+
+        if incumbent is None:
+            incumbent = heuristics.firstFitDecreasing(piece_sizes, piece_amounts, stock_length)
+        self.incumbent = incumbent
+
+    def addArtificial(self, row):
+        self.master.addColumn([row], [1.0], self.big)
+        self.paths.append(None)
+        self.patterns.append(None)
+
+    def addPattern(self, pattern):
+        if tuple(pattern) in self.seen:
+            return False
+        self.seen.add(tuple(pattern))
+        arcs = set(pricing.patternArcs(pattern, self.piece_sizes))
+
+        rows = [i for i, a in enumerate(pattern) if a]
+        values = [pattern[i] for i in rows]
+        for arc, row in self.arc_rows.items():
+            if arc in arcs:
+                rows.append(row)
+                values.append(1)
+        self.master.addColumn(rows, values)
+        self.paths.append(arcs)
+        self.patterns.append(list(pattern))
+        self.new_patterns.append(list(pattern))
+        return True
+
+    def arcRow(self, arc):
+        '''The master row of an arc's flow, created on the first branch on it.'''
+        if arc not in self.arc_rows:
+            row = self.master.addConstraint()
+            self.arc_rows[arc] = row
+            users = [j for j, arcs in enumerate(self.paths) if arcs is not None and arc in arcs]
+            self.master.setRow(row, users, [1] * len(users))
+            self.addArtificial(row)
+        return self.arc_rows[arc]
+
+    def solve(self):
+        '''Search the tree; returns (best Packing, proven lower bound on the stock used).'''
+        # best bound first, deeper nodes first among equal bounds
+        heap = [(0.0, 0, 0, Node(0.0, {}))]
+        counter = 1
+        self.emit('branch_started', 'Branch-and-price...', incumbent=self.incumbent.stockUsed())
+
+        while heap and lowerBound(heap[0][0]) < self.incumbent.stockUsed():
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                break
+            entry = heappop(heap)
+            node = entry[3]
+            self.nodes += 1
+
+            lp = self.solveNode(node)
+            if self.interrupted:
+                # the node is still open
+                heappush(heap, entry)
+                break
+            bound = lowerBound(heap[0][0]) if heap else None
+            self.emit('node', nodes=self.nodes, depth=node.depth, lp=lp, incumbent=self.incumbent.stockUsed(), open=len(heap), bound=bound)
+            if lp is None or lowerBound(lp) >= self.incumbent.stockUsed():
+                continue
+
+            values = self.master.primals()
+            self.tryRounding(values)
+
+            flows = {}
+            for j, x in enumerate(values):
+                if x > EPS and self.paths[j] is not None:
+                    for arc in self.paths[j]:
+                        flows[arc] = flows.get(arc, 0.0) + x
+            fractional = [(abs(f - floor(f) - 0.5), arc, f) for arc, f in flows.items() if EPS < f - floor(f) < 1 - EPS]
+
+            if not fractional:
+                # integral arc flows: decompose them into whole stock pieces
+                packing = self.decompose(flows)
+                if packing.stockUsed() < self.incumbent.stockUsed():
+                    self.setIncumbent(packing)
+                continue
+
+            _, arc, f = min(fractional)
+            self.arcRow(arc)
+            lower, upper = node.limits.get(arc, (None, None))
+            for limit in ((lower, floor(f)), (ceil(f), upper)):
+                child = dict(node.limits)
+                child[arc] = limit
+                heappush(heap, (lp, -node.depth - 1, counter, Node(lp, child, node.depth + 1)))
+                counter += 1
+
+        best = self.incumbent.stockUsed()
+        bound = min([best] + [lowerBound(entry[0]) for entry in heap])
+        self.master.end()
+        self.emit('branch_finished', f' Done!\n{self.nodes} nodes explored, best Z = {best}, lower bound {bound}.\n', nodes=self.nodes, objective=best, bound=bound)
+        return self.incumbent, bound
+
+    def solveNode(self, node):
+        '''Column generation at a node; returns its LP value, or None when the node is infeasible or pruned.'''
+        n = len(self.piece_sizes)
+        for arc, row in self.arc_rows.items():
+            self.master.setBounds(row, *node.limits.get(arc, (None, None)))
+
+        while True:
+            if self.stop():
+                self.interrupted = True
+                return None
+            lp = self.master.solveLP()
+            duals = self.master.duals()
+            arc_values = {arc: duals[row] for arc, row in self.arc_rows.items() if abs(duals[row]) > 1e-12}
+            found = pricing.bestPaths(duals[:n], self.piece_sizes, self.stock_length, arc_values, self.columns)
+            value = found[0][0]
+
+            # Lagrangian bound over the solutions better than the incumbent,
+            # which use at most incumbent - 1 stock pieces
+            if value > 1 and lowerBound(lp - (self.incumbent.stockUsed() - 1) * (value - 1)) >= self.incumbent.stockUsed():
+                return None
+
+            added = [pattern for v, pattern in found if v > 1 + EPS and self.addPattern(pattern)]
+            if not added:
+                break
+
+        values = self.master.primals()
+        if any(values[j] > EPS for j, arcs in enumerate(self.paths) if arcs is None):
+            return None
+        return lp
+
+    def tryRounding(self, values):
+        used = [j for j, x in enumerate(values) if x > EPS and self.patterns[j] is not None]
+        packing = heuristics.residualRounding(self.piece_sizes, self.piece_amounts, self.stock_length, [self.patterns[j] for j in used], [values[j] for j in used])
+        if packing.stockUsed() < self.incumbent.stockUsed():
+            self.setIncumbent(packing)
+
+    def decompose(self, flows):
+        '''Split integral arc flows into paths, one per stock piece.'''
+        remaining = {arc: int(round(f)) for arc, f in flows.items() if round(f) > 0}
+        outgoing = {}
+        ends = {}
+        for (i, load), f in remaining.items():
+            outgoing.setdefault(load, []).append((i, load))
+            end = load + self.piece_sizes[i]
+            ends[end] = ends.get(end, 0) + f
+            ends[load] = ends.get(load, 0) - f
+
+        packing = heuristics.Packing('branch-and-price')
+        while any(remaining[arc] for arc in outgoing.get(0, [])):
+            pattern = [0] * len(self.piece_sizes)
+            load = 0
+            while True:
+                # a path may end wherever more flow comes in than goes out
+                if load and ends.get(load, 0) > 0:
+                    ends[load] -= 1
+                    break
+                arc = next((arc for arc in outgoing.get(load, []) if remaining[arc]), None)
+                if arc is None:
+                    break
+                remaining[arc] -= 1
+                pattern[arc[0]] += 1
+                load += self.piece_sizes[arc[0]]
+            packing.add(pattern, 1)
+        return heuristics.mergePatterns(packing)
+
+    def setIncumbent(self, packing):
+        packing.name = 'branch-and-price'
+        self.incumbent = packing
+        self.emit('incumbent', objective=packing.stockUsed())
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cutting-stock')
+MAX_ENTRIES = 1000
+MAX_POOL = 5000
+
+
+def normalizeOrders(piece_sizes, piece_amounts):
+    '''Merge equal lengths and sort by length: [(size, amount), ...].'''
+    demand = {}
+    for size, amount in zip(piece_sizes, piece_amounts):
+        demand[int(size)] = demand.get(int(size), 0) + int(amount)
+    return sorted(demand.items())
+
+
+def digest(data):
+    '''A stable hex key for JSON-serializable data (dict keys in any order).'''
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def mapPattern(pattern, from_sizes, to_sizes):
+    '''Re-index a pattern over from_sizes to the order of to_sizes.
+
+    Pieces go to the first row of their length; lengths missing from to_sizes
+    are dropped (they become trim loss).
+    '''
+    index = {}
+    for i, size in enumerate(to_sizes):
+        index.setdefault(size, i)
+    mapped = [0] * len(to_sizes)
+    for size, count in zip(from_sizes, pattern):
+        if count and size in index:
+            mapped[index[size]] += count
+    return mapped
+
+
+def mapPlan(plan, from_sizes, to_sizes, to_amounts):
+    '''Re-index a cut plan, [(count, pattern, tag), ...] over from_sizes, to the rows of to_sizes.
+
+    Unlike mapPattern, pieces of a length that has several rows in to_sizes
+    are shared out by demand: each row gets up to its amount, in order, and
+    only what is cut beyond all of them goes to the first row that was
+    ordered at all. An entry whose copies need different shares is split
+    into several entries with the same tag (e.g. the stock type); lengths
+    with a single row never need that.
+    Returns [(count, pattern, tag), ...] over to_sizes.
+    '''
+    rows = {}
+    for i, size in enumerate(to_sizes):
+        rows.setdefault(size, []).append(i)
+    left = [int(amount) for amount in to_amounts]
+
+    mapped_plan = []
+    for count, pattern, tag in plan:
+        cuts = {}
+        for size, k in zip(from_sizes, pattern):
+            if k and size in rows:
+                cuts[size] = cuts.get(size, 0) + int(k)
+        count = int(count)
+        while count > 0:
+            mapped = [0] * len(to_sizes)
+            taken = []
+            copies = count
+            for size, k in cuts.items():
+                if len(rows[size]) == 1:
+                    mapped[rows[size][0]] += k
+                    continue
+                for i in rows[size]:
+                    take = min(k, left[i])
+                    if take:
+                        mapped[i] += take
+                        taken.append((i, take))
+                        k -= take
+                        # copies beyond this would overshoot the row's demand
+                        copies = min(copies, left[i] // take)
+                if k:
+                    target = next((i for i in rows[size] if to_amounts[i]), rows[size][0])
+                    mapped[target] += k
+            for i, take in taken:
+                left[i] -= copies * take
+            mapped_plan.append((copies, mapped, tag))
+            count -= copies
+    return mapped_plan
+
+
+class SolveCache:
+    '''On-disk cache of solved jobs and of column generation pattern pools.
+
+    Solutions are keyed by the normalized order book (lengths with their
+    merged amounts), the stock length and the solver options. Pattern pools
+    only depend on the set of lengths and the stock length, so they are shared
+    by every job that cuts the same lengths from the same stock.
+
+    Each entry is one JSON file; the least recently used ones are removed once
+    there are more than max_entries.
+    '''
+    def __init__(self, directory=DEFAULT_DIR, max_entries=MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, f'{kind}-{key}.json')
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, path, data):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def solutionKey(self, piece_sizes, piece_amounts, stock_length, options):
+        return digest({'orders': normalizeOrders(piece_sizes, piece_amounts), 'stock_length': int(stock_length), 'options': options})
+
+    def poolKey(self, piece_sizes, stock_length):
+        return digest({'sizes': sorted(set(int(s) for s in piece_sizes)), 'stock_length': int(stock_length)})
+
+    def loadSolution(self, piece_sizes, piece_amounts, stock_length, options):
+        '''Return the stored result dict for this job, re-indexed to piece_sizes, or None.'''
+        data = self._read(self._path('solution', self.solutionKey(piece_sizes, piece_amounts, stock_length, options)))
+        if data is None:
+            return None
+        plan = mapPlan([(entry['count'], entry['cuts'], entry) for entry in data['patterns']], data['piece_sizes'], piece_sizes, piece_amounts)
+        data['patterns'] = [dict(entry, count=count, cuts=cuts) for count, cuts, entry in plan]
+        data['piece_sizes'] = list(piece_sizes)
+        data['piece_amounts'] = list(piece_amounts)
+        return data
+
+    def storeSolution(self, result, options):
+        self._write(self._path('solution', self.solutionKey(result.piece_sizes, result.piece_amounts, result.stock_length, options)), result.asDict())
+
+    def loadPool(self, piece_sizes, stock_length):
+        '''Patterns found earlier for the same lengths and stock, re-indexed to piece_sizes.'''
+        data = self._read(self._path('pool', self.poolKey(piece_sizes, stock_length)))
+        if data is None:
+            return []
+        return [mapPattern(pattern, data['sizes'], piece_sizes) for pattern in data['patterns']]
+
+    def storePool(self, piece_sizes, stock_length, patterns):
+        '''Merge patterns (indexed like piece_sizes) into the pool of these lengths.'''
+        sizes = sorted(set(int(s) for s in piece_sizes))
+        path = self._path('pool', self.poolKey(piece_sizes, stock_length))
+
+        data = self._read(path)
+        pool = data['patterns'] if data else []
+        known = set(tuple(pattern) for pattern in pool)
+        for pattern in patterns:
+            mapped = mapPattern(pattern, piece_sizes, sizes)
+            if tuple(mapped) not in known:
+                known.add(tuple(mapped))
+                pool.append(mapped)
+
+        self._write(path, {'sizes': sizes, 'stock_length': int(stock_length), 'patterns': pool[-MAX_POOL:]})
@@ -0,0 +1,96 @@
+import argparse
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import sys
+
+from backends import BACKENDS
+import orders
+import stock
+
+
+@contextmanager
+def quietStdout():
+    '''Send GLPK's log, which it writes straight to the C-level stdout, to /dev/null.'''
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def readOrderArgs(items):
+    '''(length, amount) pairs from LENGTHxAMOUNT items and order files (see orders.iterOrders).'''
+    for item in items:
+        length, sep, amount = item.lower().partition('x')
+        if sep and length.strip().isdigit() and amount.strip().isdigit():
+            yield int(length), int(amount)
+        else:
+            yield from orders.iterOrders(item)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve one cutting-stock problem from the command line, without the GUI.')
+    parser.add_argument('orders', nargs='+', help='orders as LENGTHxAMOUNT (e.g. 1380x22) or order files (.csv, .json, .jsonl)')
+    parser.add_argument('-s', '--stock', required=True, help='stock length, or a catalogue such as "6000:1.1:20, 5600" (length:cost:available)')
+    parser.add_argument('-m', '--method', type=int, choices=(1, 2, 3), default=2, help='1: generate all patterns, 2: column generation (default), 3: arc-flow model')
+    parser.add_argument('--time-limit', type=float, default=None, help='solver time limit in seconds; the best solution found by then is printed')
+    parser.add_argument('-b', '--branch-and-price', action='store_true', help='prove optimality with branch-and-price (method 2)')
+    parser.add_argument('--no-presolve', action='store_true', help='model the orders as they are')
+    parser.add_argument('--backend', choices=BACKENDS, default='glpk', help='LP/MIP backend: glpk (default) or highs (needs scipy)')
+    parser.add_argument('--cache', default=None, metavar='DIR', help='solution cache directory (default: ~/.cache/cutting-stock)')
+    parser.add_argument('--no-cache', action='store_true', help='neither read nor store cached solutions')
+    parser.add_argument('--plan', default=None, metavar='PATH', help='also write the cut plan to PATH (.csv or .json)')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON instead of the cut list')
+    parser.add_argument('-v', '--verbose', action='store_true', help="print progress to stderr and let GLPK's log through")
+    args = parser.parse_args(argv)
+
+    try:
+        merged = orders.mergeOrders(readOrderArgs(args.orders))
+        stock_length = stock.parseCatalogue(args.stock)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not merged:
+        print('nothing to cut', file=sys.stderr)
+        return 2
+
+    # the solver is only imported once the arguments are known to be good
+    import solver
+    from cache import SolveCache
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = SolveCache(args.cache) if args.cache else SolveCache()
+        except OSError:
+            pass
+    progress = None
+    if args.verbose:
+        progress = lambda event: print(event['message'], end='', file=sys.stderr, flush=True) if event['message'] else None
+    options = {'timeLimit': args.time_limit, 'branchAndPrice': args.branch_and_price, 'presolve': not args.no_presolve, 'backend': args.backend}
+
+    try:
+        with nullcontext() if args.verbose else quietStdout():
+            result = solver.solve([size for size, _ in merged], [amount for _, amount in merged], stock_length, args.method, progress=progress, cache=cache, **options)
+        if args.plan:
+            orders.writeCutPlan(args.plan, result)
+    except (OSError, ValueError, solver.SolveStopped) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(result.asDict(), indent=2))
+    else:
+        print(solver.interpretResults(result), end='')
+        print(f'Z = {result.objective:.2f}' + (' (stopped early)' if result.stopped_early else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
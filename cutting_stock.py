@@ -1,17 +1,28 @@
-import ctypes
-import inspect
-from math import ceil
-import pymprog
-import threading
-from time import time
+import backends
+import multiprocessing
+import orders
+import stock
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, messagebox, ttk
+import worker
+
+
+# how often the main loop looks for solver progress, in milliseconds
+POLL_INTERVAL = 50
+
+ORDER_FILES = [('Order files', '*.csv *.json *.jsonl *.ndjson'), ('All files', '*')]
+EXPORT_FILES = [('CSV', '*.csv'), ('JSON', '*.json')]
 
 
 class GUI:
     def __init__(self, root):
         self.root = root
         self.topOpen = False
+        self.lastResult = None
+        # the solver runs in its own process, started now so the first solve does not wait for it
+        self.worker = worker.SolverWorker()
+        self.worker.start()
+        self.root.protocol('WM_DELETE_WINDOW', self.close)
         self.root.resizable(False, False)
         self.root.title('Cutting-Stock Problem')
         self.showMainScreen()
@@ -68,13 +79,25 @@ class GUI:
         self.optionsFrame.grid_columnconfigure(0, weight=1)
         self.optionsFrame.grid_columnconfigure(1, weight=1)
 
-        self.addRowButton = tk.Button(self.optionsFrame, text='Add Row', command=self.openAddRow, relief='groove')
-        self.addRowButton.grid(row=0, column=0, pady=10)
+        self.rowButtonsFrame = tk.Frame(self.optionsFrame)
+        self.rowButtonsFrame.grid(row=0, column=0, pady=10)
+
+        self.addRowButton = tk.Button(self.rowButtonsFrame, text='Add Row', command=self.openAddRow, relief='groove')
+        self.addRowButton.pack(side='left')
+
+        self.importButton = tk.Button(self.rowButtonsFrame, text='Import...', command=self.importOrders, relief='groove')
+        self.importButton.pack(side='left', padx=(5, 0))
+
+        self.exportOrdersButton = tk.Button(self.rowButtonsFrame, text='Export...', command=self.exportOrders, relief='groove')
+        self.exportOrdersButton.pack(side='left', padx=(5, 0))
+
+        self.exportPlanButton = tk.Button(self.rowButtonsFrame, text='Export Plan...', command=self.exportPlan, relief='groove', state='disabled')
+        self.exportPlanButton.pack(side='left', padx=(5, 0))
 
         self.widthFrame = tk.Frame(self.optionsFrame)
         self.widthFrame.grid(row=0, column=1, pady=10)
 
-        self.widthLabel = tk.Label(self.widthFrame, text='Stock length')
+        self.widthLabel = tk.Label(self.widthFrame, text='Stock length(s)')
         self.widthLabel.grid(row=0, column=0)
 
         self.widthEntry = tk.Entry(self.widthFrame)
@@ -91,6 +114,13 @@ class GUI:
         self.methodRadio2 = tk.Radiobutton(self.methodFrame, text='Generate patterns when needed (fast)', variable=self.method, value=2)
         self.methodRadio2.pack(anchor='nw')
 
+        self.useBranching = tk.IntVar(None, 0)
+        self.useBranchingCheck = tk.Checkbutton(self.methodFrame, text='Prove optimality (branch-and-price)', variable=self.useBranching, state='disabled')
+        self.useBranchingCheck.pack(anchor='nw', padx=(20, 0))
+
+        self.methodRadio3 = tk.Radiobutton(self.methodFrame, text='Solve one arc-flow model (exact)', variable=self.method, value=3)
+        self.methodRadio3.pack(anchor='nw')
+
         self.experimentalFrame = tk.LabelFrame(self.optionsFrame, text='Experimental')
         self.experimentalFrame.grid(row=1, column=1, pady=(0, 10))
 
@@ -102,6 +132,10 @@ class GUI:
         self.useTightCheck = tk.Checkbutton(self.experimentalFrame, text='Use tighter constraints', variable=self.useTight)
         self.useTightCheck.pack(anchor='nw')
 
+        self.useHighs = tk.IntVar(None, 0)
+        self.useHighsCheck = tk.Checkbutton(self.experimentalFrame, text='Solve with HiGHS instead of GLPK', variable=self.useHighs, state='normal' if backends.available('highs') else 'disabled')
+        self.useHighsCheck.pack(anchor='nw')
+
         self.solveButton = tk.Button(self.optionsFrame, text='SOLVE', command=self.prepareSolve, width=20, bg='yellow', activebackground='yellow', relief='ridge')
         self.solveButton.grid(row=2, column=0, columnspan=2, pady=(0, 10))
 
@@ -119,13 +153,19 @@ class GUI:
 
         self.methodRadio1.bind('<1>', lambda e: self.changeExperimentalState(1))
         self.methodRadio2.bind('<1>', lambda e: self.changeExperimentalState(0))
+        self.methodRadio3.bind('<1>', lambda e: self.changeExperimentalState(0, 0))
 
-    def changeExperimentalState(self, state):
+    def changeExperimentalState(self, state, branchingState=None):
         if state == 0:
             self.useLoss.set(0)
             self.useTight.set(0)
         self.useLossCheck.config(state=('disabled' if state == 0 else 'normal'))
         self.useTightCheck.config(state=('disabled' if state == 0 else 'normal'))
+        if branchingState is None:
+            branchingState = 1 - state
+        if branchingState == 0:
+            self.useBranching.set(0)
+        self.useBranchingCheck.config(state=('normal' if branchingState == 1 else 'disabled'))
 
     def handleDeletePressed(self, event):
         if self.topOpen:
@@ -239,6 +279,49 @@ class GUI:
 
         self.top.destroy()
 
+    def tableOrders(self):
+        return [(int(self.table.item(item, 'values')[0]), int(self.table.item(item, 'values')[1])) for item in self.table.get_children()]
+
+    def importOrders(self):
+        path = filedialog.askopenfilename(parent=self.root, title='Import Orders', filetypes=ORDER_FILES)
+        if not path:
+            return
+
+        # imported rows are added to the table; equal lengths become one row
+        try:
+            merged = orders.mergeOrders(self.tableOrders() + orders.readOrders(path))
+        except (OSError, ValueError) as e:
+            messagebox.showerror('Import Orders', str(e), parent=self.root)
+            return
+
+        self.table.delete(*self.table.get_children())
+        for length, amount in merged:
+            self.table.insert(parent='', index='end', values=(length, amount))
+
+    def exportOrders(self):
+        path = filedialog.asksaveasfilename(parent=self.root, title='Export Orders', filetypes=EXPORT_FILES, defaultextension='.csv')
+        if not path:
+            return
+
+        try:
+            orders.writeOrders(path, self.tableOrders())
+        except (OSError, ValueError) as e:
+            messagebox.showerror('Export Orders', str(e), parent=self.root)
+
+    def exportPlan(self):
+        if self.lastResult is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self.root, title='Export Cut Plan', filetypes=EXPORT_FILES, defaultextension='.csv')
+        if not path:
+            return
+
+        # the solver itself runs in the worker; here it only rebuilds the result
+        import solver
+        try:
+            orders.writeCutPlan(path, solver.SolveResult.fromDict(self.lastResult))
+        except OSError as e:
+            messagebox.showerror('Export Cut Plan', str(e), parent=self.root)
+
     def topDestroyed(self, event):
         self.topOpen = False
 
@@ -247,14 +330,12 @@ class GUI:
         self.resultsText.insert('end', text)
         self.resultsText.config(state='disabled')
         self.resultsText.see('end')
-        self.resultsText.update()
 
     def clearResults(self):
         self.resultsText.config(state='normal')
         self.resultsText.delete(1.0, 'end')
         self.resultsText.config(state='disabled')
         self.resultsText.see('end')
-        self.resultsText.update()
 
     def prepareSolve(self):
         self.piece_sizes = []
@@ -265,11 +346,13 @@ class GUI:
         # self.useTight
 
         try:
-            for item in self.table.get_children():
-                self.piece_sizes.append(int(self.table.item(item, 'values')[0]))
-                self.piece_amounts.append(int(self.table.item(item, 'values')[1]))
+            # one demand row per length keeps the models small
+            for size, amount in orders.mergeOrders(self.tableOrders()):
+                self.piece_sizes.append(size)
+                self.piece_amounts.append(amount)
 
-            self.stock_length = int(self.widthEntry.get())
+            # a plain length, or a catalogue "length:cost:available, ..."
+            self.stock_length = stock.parseCatalogue(self.widthEntry.get())
 
         except ValueError:
             return
@@ -279,310 +362,48 @@ class GUI:
         if not self.piece_sizes or not self.piece_amounts:
             return
 
-        if any(s > self.stock_length for s in self.piece_sizes):
+        longest = max(s.length for s in self.stock_length) if stock.isCatalogue(self.stock_length) else self.stock_length
+        if any(s > longest for s in self.piece_sizes):
             return
 
         self.clearResults()
-        # self.solve(self.piece_sizes, self.piece_amounts, self.stock_length, self.method.get(), self.useLoss.get(), self.useTight.get())
-        solve_thread = ThreadWithExc(target=self.solve, daemon=True, args=(self.piece_sizes, self.piece_amounts, self.stock_length, self.method.get(), self.useLoss.get(), self.useTight.get()))
-
-        self.solveButton.config(text='Cancel', command=lambda: self.cancel(solve_thread), bg='red', activebackground='red')
-
-        solve_thread.start()
-
-    def cancel(self, solve_thread):
-        solve_thread.raiseExc(ThreadStoppedControlledException)
-
-    def solve(self, piece_sizes, piece_amounts, stock_length, method = 1, useLoss = 0, useTight = 0):
-        try:
-            start = time()
-
-            if method == 1:
-                def findRightmostNonZero(A):
-                    for i in range(-1, -(len(A) + 1), -1):
-                        # if A[i] != 0 and i != -1:
-                        if A[i] != 0:
-                            return i
-                    return 0
-
-                y = []
-                loss = []
-
-                self.printToResults('Generating all patterns...')
-
-                #  init
-                x = []
-                for j in range(len(piece_sizes)):
-                    s = 0
-                    for k in range(j):
-                        s += x[k] * piece_sizes[k]
-                    x.append((stock_length - s) // piece_sizes[j])
-
-                if useLoss:
-                    temp_loss = stock_length
-                    for i in range(len(piece_sizes)):
-                        temp_loss -= (x[i] * piece_sizes[i])
-                    loss.append(temp_loss)
-                y += [x[:]]
-
-                while(True):
-                    z = findRightmostNonZero(x)
-                    if not z:
-                        break
-
-                    x[z] -= 1
-                    for j in range(z + len(piece_sizes) + 1, len(piece_sizes)):
-                        s = 0
-                        for k in range(j):
-                            s += x[k] * piece_sizes[k]
-                        x[j] = (stock_length - s) // piece_sizes[j]
-
-                    if useLoss:
-                        temp_loss = stock_length
-                        for i in range(len(piece_sizes)):
-                            temp_loss -= (x[i] * piece_sizes[i])
-                        loss.append(temp_loss)
-                    y += [x[:]]
-
-                # remove do-nothing pattern
-                y.pop()
-                if useLoss:
-                    loss.pop()
-
-                self.printToResults(f' Done!\n{len(y)} patterns generated.\n')
-
-
-                self.printToResults('Solving...')
-                # begin modelling
-                model = pymprog.model('cutting-stock')
-                # model.verbose(True)
-
-                # variables
-                x = model.var('x', len(y), bounds=(0, None), kind=int)
-
-                # objective
-                if useLoss:
-                    model.minimize(sum(loss[j] * x[j] for j in range(len(y))), 'Z')
-                else:
-                    model.minimize(sum(x[j] for j in range(len(y))), 'Z')
-
-                # constraints
-                for i in range(len(piece_sizes)):
-                    sum(y[j][i] * x[j] for j in range(len(y))) >= piece_amounts[i]
-
-                if useTight:
-                    for i in range(len(piece_sizes)):
-                        sum(y[j][i] * x[j] for j in range(len(y))) <= piece_amounts[i]
-
-                # solve the problem
-                model.solve()
-
-                model.end()
-
-                end = time()
-
-                self.printToResults(f' Done!\nZ = {model.vobj():.2f}\n')
-                self.printToResults(self.interpretResults(x, y, piece_sizes))
-                self.printToResults(f'Took {(end - start):.3f} seconds.')
-
-
-            elif method == 2:
-                self.printToResults('Starting delayed column generation process...')
-
-                # generate initial patterns, enough to get a feasible solution
-                y = [[((stock_length // piece_sizes[i]) if i == j else 0) for i in range(len(piece_sizes))] for j in range(len(piece_sizes))]
-
-                while True:
-                    # begin modelling
-                    model = pymprog.model('cutting-stock')
-                    # model.verbose(True)
-
-                    # variables
-                    x = model.var('x', len(y), bounds=(0, None))
-
-                    # objective
-                    model.minimize(sum(x[j] for j in range(len(y))), 'Z')
-
-                    # constraints
-                    R = []
-                    for i in range(len(piece_sizes)):
-                        R.append(sum(y[j][i] * x[j] for j in range(len(y))) >= piece_amounts[i])
-
-                    # solve the problem
-                    model.solve()
-
-                    model.end()
-
-                    ####################################################################
-                    model2 = pymprog.model('knapsack-subproblem')
-
-                    # variables
-                    z = model2.var('z', len(piece_sizes), bounds=(0, None), kind=int)
-
-                    # objective
-                    model2.maximize(sum(R[j].dual * z[j] for j in range(len(piece_sizes))), 'Z')
-
-                    # constraints
-                    sum(piece_sizes[j] * z[j] for j in range(len(piece_sizes))) <= stock_length
-
-                    # solve the problem
-                    model2.solve()
-
-                    if model2.vobj() < 1.0001:
-                        break
-
-                    temp = [z[j].primal for j in range(len(piece_sizes))]
-                    if temp in y:
-                        self.printToResults('\nStopping early because of an error...')
-                        break
-                    y.append(temp[:])
-
-                    model2.end()
-
-                self.printToResults(f' Done!\n{len(y)} patterns generated.\n')
-
-
-                self.printToResults('Solving LP...')
-                # begin modelling
-                model = pymprog.model('cutting-stock')
-
-                # variables
-                x = model.var('x', len(y), bounds=(0, None))
-
-                # objective
-                model.minimize(sum(x[j] for j in range(len(y))), 'Z')
-
-                # constraints
-                for i in range(len(piece_sizes)):
-                    sum(y[j][i] * x[j] for j in range(len(y))) >= piece_amounts[i]
-
-                # solve the problem
-                model.solve()
-
-                model.end()
-
-                self.printToResults(f' Done!\nZ = {model.vobj():.2f} so a minimum of {ceil(model.vobj())} master (stock) pieces are required.\n')
-
-
-                self.printToResults('Solving IP...')
-                # begin modelling
-                model = pymprog.model('cutting-stock')
-
-                # variables
-                x = model.var('x', len(y), bounds=(0, None), kind=int)
-
-                # objective
-                model.minimize(sum(x[j] for j in range(len(y))), 'Z')
-
-                # constraints
-                for i in range(len(piece_sizes)):
-                    sum(y[j][i] * x[j] for j in range(len(y))) >= piece_amounts[i]
-
-                # solve the problem
-                model.solve()
-
-                model.end()
-
-                end = time()
-
-                self.printToResults(f' Done!\nFound a solution where Z = {model.vobj():.2f}\n')
-                self.printToResults(self.interpretResults(x, y, piece_sizes))
-                self.printToResults(f'Took {(end - start):.3f} seconds.')
-        except ThreadStoppedControlledException:
-            print('Thread stopped!')
-            self.printToResults('\n\nSolving stopped!\n')
-        finally:
-            self.solveButton.config(text='Solve', command=self.prepareSolve, bg='yellow', activebackground='yellow')
-
-    def interpretResults(self, x, y, piece_sizes):
-        interpretation = ''
-        for i, xi in enumerate(x):
-            if xi.primal:
-                temp_str = ''
-                for j, val in enumerate(y[i]):
-                    if val:
-                        if temp_str:
-                            temp_str += ' + '
-                        temp_str += str(piece_sizes[j]) + int(val - 1) * (' + ' + str(piece_sizes[j]))
-                interpretation += f'{int(xi.primal)} x ({temp_str})\n'
-        return interpretation
-
-
-# code below from: https://stackoverflow.com/a/325528
-##############################################################################
-def _async_raise(tid, exctype):
-    '''Raises an exception in the threads with id tid'''
-    if not inspect.isclass(exctype):
-        raise TypeError("Only types can be raised (not instances)")
-    res = ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_long(tid),
-                                                     ctypes.py_object(exctype))
-    if res == 0:
-        raise ValueError("invalid thread id")
-    elif res != 1:
-        # "if it returns a number greater than one, you're in trouble,
-        # and you should call it again with exc=NULL to revert the effect"
-        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_long(tid), None)
-        raise SystemError("PyThreadState_SetAsyncExc failed")
-
-class ThreadWithExc(threading.Thread):
-    '''A thread class that supports raising an exception in the thread from
-       another thread.
-    '''
-    def _get_my_tid(self):
-        """determines this (self's) thread id
-
-        CAREFUL: this function is executed in the context of the caller
-        thread, to get the identity of the thread represented by this
-        instance.
-        """
-        if not self.isAlive():
-            raise threading.ThreadError("the thread is not active")
-
-        # do we have it cached?
-        if hasattr(self, "_thread_id"):
-            return self._thread_id
-
-        # no, look for it in the _active dict
-        for tid, tobj in threading._active.items():
-            if tobj is self:
-                self._thread_id = tid
-                return tid
-
-        # TODO: in python 2.6, there's a simpler way to do: self.ident
-
-        raise AssertionError("could not determine the thread's id")
-
-    def raiseExc(self, exctype):
-        """Raises the given exception type in the context of this thread.
-
-        If the thread is busy in a system call (time.sleep(),
-        socket.accept(), ...), the exception is simply ignored.
-
-        If you are sure that your exception should terminate the thread,
-        one way to ensure that it works is:
-
-            t = ThreadWithExc( ... )
-            ...
-            t.raiseExc( SomeException )
-            while t.isAlive():
-                time.sleep( 0.1 )
-                t.raiseExc( SomeException )
-
-        If the exception is to be caught by the thread, you need a way to
-        check that your thread has caught it.
-
-        CAREFUL: this function is executed in the context of the
-        caller thread, to raise an exception in the context of the
-        thread represented by this instance.
-        """
-        _async_raise( self._get_my_tid(), exctype )
-##############################################################################
-
-class ThreadStoppedControlledException(Exception):
-    pass
+        self.lastResult = None
+        self.exportPlanButton.config(state='disabled')
+        self.solve(self.piece_sizes, self.piece_amounts, self.stock_length, self.method.get(), self.useLoss.get(), self.useTight.get(), self.useBranching.get(), self.useHighs.get())
+
+    def cancel(self):
+        # the solver stops at its next checkpoint, or its process is killed
+        self.worker.cancel()
+        self.solveButton.config(text='Cancelling...', state='disabled')
+
+    def solve(self, piece_sizes, piece_amounts, stock_length, method = 1, useLoss = 0, useTight = 0, useBranching = 0, useHighs = 0):
+        self.worker.solve(piece_sizes, piece_amounts, stock_length, method, useLoss=useLoss, useTight=useTight, branchAndPrice=bool(useBranching), backend='highs' if useHighs else 'glpk')
+        self.solveButton.config(text='Cancel', command=self.cancel, bg='red', activebackground='red')
+        self.root.after(POLL_INTERVAL, self.pollWorker)
+
+    def pollWorker(self):
+        for event in self.worker.events():
+            self.showProgress(event)
+        if self.worker.busy:
+            self.root.after(POLL_INTERVAL, self.pollWorker)
+        else:
+            self.solveButton.config(text='Solve', command=self.prepareSolve, bg='yellow', activebackground='yellow', state='normal')
+
+    def showProgress(self, event):
+        if event['message']:
+            self.printToResults(event['message'])
+        if event['event'] == 'result':
+            self.lastResult = event['result']
+            self.exportPlanButton.config(state='normal')
+
+    def close(self):
+        self.worker.close()
+        self.root.destroy()
 
 
 if __name__ == '__main__':
+    # the solver process is started with spawn, which frozen executables need this for
+    multiprocessing.freeze_support()
     root = tk.Tk()
     GUI(root)
     root.mainloop()
@@ -0,0 +1,159 @@
+from math import floor
+import pricing
+
+
+class Packing:
+    '''An integer solution: counts[j] stock pieces are cut with patterns[j].'''
+    def __init__(self, name, patterns=None, counts=None):
+        self.name = name
+        self.patterns = patterns or []
+        self.counts = counts or []
+
+    def stockUsed(self):
+        return sum(self.counts)
+
+    def add(self, pattern, count):
+        if count > 0:
+            self.patterns.append(list(pattern))
+            self.counts.append(int(count))
+
+
+def mergePatterns(packing):
+    '''Combine identical patterns.'''
+    merged = {}
+    for pattern, count in zip(packing.patterns, packing.counts):
+        merged[tuple(pattern)] = merged.get(tuple(pattern), 0) + count
+    return Packing(packing.name, [list(p) for p in merged], list(merged.values()))
+
+
+def firstFitDecreasing(piece_sizes, piece_amounts, stock_length, name='ffd'):
+    '''First-fit decreasing, with identical bins handled as one group.
+
+    Bins are kept as [pattern, remaining length, number of such bins] in
+    opening order. Placing d pieces of one length first-fit fills the first
+    bins of a group completely, possibly one more partially, and opens new
+    bins only after all groups are full, so the work grows with the number of
+    distinct bins instead of the number of pieces.
+    '''
+    n = len(piece_sizes)
+    groups = []
+    for i in sorted(range(n), key=lambda i: piece_sizes[i], reverse=True):
+        size = piece_sizes[i]
+        left = piece_amounts[i]
+        if left <= 0:
+            continue
+
+        updated = []
+        for pattern, room, count in groups:
+            fit = room // size
+            if not left or not fit:
+                updated.append([pattern, room, count])
+                continue
+            full = min(count, left // fit)
+            if full:
+                filled = pattern[:]
+                filled[i] += fit
+                updated.append([filled, room - fit * size, full])
+                left -= full * fit
+            rest = count - full
+            if rest and left:
+                partial = pattern[:]
+                partial[i] += left
+                updated.append([partial, room - left * size, 1])
+                left = 0
+                rest -= 1
+            if rest:
+                updated.append([pattern, room, rest])
+
+        fit = stock_length // size
+        if left >= fit:
+            pattern = [0] * n
+            pattern[i] = fit
+            updated.append([pattern, stock_length - fit * size, left // fit])
+            left %= fit
+        if left:
+            pattern = [0] * n
+            pattern[i] = left
+            updated.append([pattern, stock_length - left * size, 1])
+        groups = updated
+
+    packing = Packing(name)
+    for pattern, _, count in groups:
+        packing.add(pattern, count)
+    return mergePatterns(packing)
+
+
+def residualRounding(piece_sizes, piece_amounts, stock_length, patterns, values):
+    '''Round an LP solution down and cover the residual demand with first-fit decreasing.'''
+    n = len(piece_sizes)
+    packing = Packing('rounding')
+    residual = list(piece_amounts)
+    for pattern, value in zip(patterns, values):
+        count = floor(value + 1e-9)
+        if count:
+            packing.add(pattern, count)
+            for i in range(n):
+                residual[i] -= count * pattern[i]
+
+    repair = firstFitDecreasing(piece_sizes, [max(0, r) for r in residual], stock_length)
+    for pattern, count in zip(repair.patterns, repair.counts):
+        packing.add(pattern, count)
+    return mergePatterns(packing)
+
+
+def sequentialValueCorrection(piece_sizes, piece_amounts, stock_length, iterations=20, smoothing=0.5):
+    '''Sequential value correction (SVC).
+
+    Each round builds a solution pattern by pattern: the next pattern is the
+    best knapsack for the current piece prices over the remaining demand, and
+    is cut as often as that demand allows. After every pattern the prices of
+    its pieces move towards the material they actually used, trim loss
+    included, so pieces that are hard to combine get more expensive in the
+    next round. The best round is returned.
+    '''
+    n = len(piece_sizes)
+    prices = [size / stock_length for size in piece_sizes]
+    best = None
+
+    for _ in range(iterations):
+        packing = Packing('svc')
+        residual = list(piece_amounts)
+        while any(r > 0 for r in residual):
+            _, pattern = pricing.bestPattern(prices, piece_sizes, stock_length, residual)
+            if not any(pattern):
+                break
+            count = min(residual[i] // pattern[i] for i in range(n) if pattern[i])
+            packing.add(pattern, count)
+
+            used = sum(pattern[i] * piece_sizes[i] for i in range(n))
+            for i in range(n):
+                if pattern[i]:
+                    residual[i] -= count * pattern[i]
+                    prices[i] = smoothing * prices[i] + (1 - smoothing) * piece_sizes[i] / used
+
+        packing = mergePatterns(packing)
+        if best is None or packing.stockUsed() < best.stockUsed():
+            best = packing
+    return best
+
+
+def bestHeuristic(piece_sizes, piece_amounts, stock_length, patterns=None, values=None, bound=None):
+    '''Run the heuristics, cheapest first, and return the best Packing.
+
+    Rounding is only tried with an LP solution (patterns and their values).
+    As soon as a Packing uses no more than `bound` stock pieces it is returned
+    without trying the rest.
+    '''
+    runs = [lambda: firstFitDecreasing(piece_sizes, piece_amounts, stock_length)]
+    if patterns is not None:
+        runs.append(lambda: residualRounding(piece_sizes, piece_amounts, stock_length, patterns, values))
+    runs.append(lambda: sequentialValueCorrection(piece_sizes, piece_amounts, stock_length))
+
+    best = None
+    for run in runs:
+        packing = run()
+        if best is None or packing.stockUsed() < best.stockUsed():
+            best = packing
+        if bound is not None and best.stockUsed() <= bound:
+            break
+    return best
@@ -0,0 +1,230 @@
+from arcflow import arcFlowProblem
+import numpy as np
+from scipy import optimize, sparse
+
+
+# scipy's status codes, shared by linprog and milp
+OPTIMAL = 0
+LIMIT = 1
+
+
+def highsOptions(timeLimit=None, gap=None):
+    '''HiGHS options for a time limit (seconds) and, for an IP, relative gap; None leaves them unset.'''
+    options = {}
+    if timeLimit is not None:
+        options['time_limit'] = float(timeLimit)
+    if gap is not None:
+        options['mip_rel_gap'] = float(gap)
+    return options
+
+
+class HighsModel:
+    '''What the HiGHS models share: solving lower <= A x <= upper, x >= 0, with scipy.
+
+    A subclass keeps `lower` and `upper` (row bounds, None for an open side)
+    and `costs`, and returns the scipy.sparse constraint matrix from
+    matrix(). HiGHS has no persistent problem object in scipy, so every
+    solve hands it the whole matrix; it starts from scratch, but its simplex
+    and branch-and-cut are fast enough on the large pattern sets to make up
+    for that.
+    '''
+    def reset(self):
+        self.integer = False
+        self.returned = None
+        self.x = None
+        self.y = None
+        self.objective = 0.0
+
+    def bounds(self):
+        lower = np.array([-np.inf if lo is None else lo for lo in self.lower], dtype=float)
+        upper = np.array([np.inf if hi is None else hi for hi in self.upper], dtype=float)
+        return lower, upper
+
+    def solveLP(self, timeLimit=None):
+        '''Solve the LP relaxation and return its objective; duals() are the row duals.'''
+        A = self.matrix().tocsr()
+        lower, upper = self.bounds()
+        eq = lower == upper
+        ge = ~eq & np.isfinite(lower)
+        le = ~eq & np.isfinite(upper)
+
+        # linprog takes <= and == rows; a >= row is negated
+        A_ub = sparse.vstack([-A[ge], A[le]], format='csr')
+        b_ub = np.concatenate([-lower[ge], upper[le]])
+        res = optimize.linprog(
+            self.costs,
+            A_ub=A_ub if A_ub.shape[0] else None, b_ub=b_ub if A_ub.shape[0] else None,
+            A_eq=A[eq] if eq.any() else None, b_eq=lower[eq] if eq.any() else None,
+            bounds=(0, None), method='highs', options=highsOptions(timeLimit))
+
+        self.integer = False
+        self.store(res)
+        self.y = np.zeros(self.rows)
+        if res.status == OPTIMAL:
+            # the marginals are the objective's derivatives by the right-hand
+            # sides, so a negated >= row has its dual negated too
+            g = int(ge.sum())
+            self.y[ge] = -res.ineqlin.marginals[:g]
+            self.y[le] += res.ineqlin.marginals[g:]
+            if eq.any():
+                self.y[eq] = res.eqlin.marginals
+        return self.objective
+
+    def solveIP(self, timeLimit=None, gap=None):
+        '''Solve with every column integer; with a limit HiGHS may stop at its incumbent.'''
+        lower, upper = self.bounds()
+        res = optimize.milp(
+            self.costs, integrality=np.ones(self.columns),
+            bounds=optimize.Bounds(0, np.inf),
+            constraints=optimize.LinearConstraint(self.matrix(), lower, upper),
+            options=highsOptions(timeLimit, gap))
+        self.integer = True
+        self.store(res)
+        return self.objective
+
+    def store(self, res):
+        self.returned = res.status
+        self.x = res.x if res.status in (OPTIMAL, LIMIT) and res.x is not None else None
+        if self.integer and self.x is not None:
+            # HiGHS leaves integer columns within its tolerance of the integer
+            self.x = np.round(self.x)
+        self.objective = float(np.dot(self.costs, self.x)) if self.x is not None else 0.0
+
+    def timedOut(self):
+        '''Whether HiGHS stopped the last solve at its time limit.'''
+        return self.returned == LIMIT
+
+    def feasible(self):
+        '''Whether the last solve found a feasible solution.'''
+        return self.x is not None and (self.integer or self.returned == OPTIMAL)
+
+    def primals(self):
+        if self.x is None:
+            return [0.0] * self.columns
+        return self.x.tolist()
+
+    def end(self):
+        self.x = self.y = None
+
+
+class MasterProblem(HighsModel):
+    '''master.MasterProblem on HiGHS: the same rows and columns, in a scipy.sparse matrix.
+
+    Columns are kept as the CSC blocks they were added in (straight from
+    the PatternMatrix arrays, without a per-non-zero loop) and joined on
+    the next solve.
+    '''
+    def __init__(self, piece_amounts, name='cutting-stock', tight=False):
+        self.tight = tight
+        self.rows = len(piece_amounts)
+        self.lower = [float(amount) for amount in piece_amounts]
+        self.upper = [float(amount) if tight else None for amount in piece_amounts]
+        self.columns = 0
+        self.costs = []
+        self.blocks = []
+        self.reset()
+
+    def addRow(self, amount):
+        '''Add a row for a new piece type; the existing columns do not cut it.'''
+        self.rows += 1
+        self.lower.append(float(amount))
+        self.upper.append(float(amount) if self.tight else None)
+
+    def setDemand(self, i, amount):
+        self.lower[i] = float(amount)
+        if self.tight:
+            self.upper[i] = float(amount)
+
+    def addConstraint(self):
+        '''Add an empty, unbounded side constraint row and return its index.'''
+        self.rows += 1
+        self.lower.append(None)
+        self.upper.append(None)
+        return self.rows - 1
+
+    def setBounds(self, i, lower=None, upper=None):
+        '''Bound row i from below and/or above (None leaves that side open).'''
+        self.lower[i] = None if lower is None else float(lower)
+        self.upper[i] = None if upper is None else float(upper)
+
+    def setRow(self, i, columns, values):
+        '''Set the coefficients of row i on the given columns (all others become 0).'''
+        A = self.matrix().tocsr()
+        A.data[A.indptr[i]:A.indptr[i + 1]] = 0
+        A = A + sparse.csr_matrix((np.asarray(values, dtype=float), ([i] * len(columns), columns)), shape=A.shape)
+        A.eliminate_zeros()
+        self.blocks = [A.tocsc()]
+
+    def addColumn(self, rows, values, cost=1.0):
+        '''Append one column with the given non-zeros and return its index.'''
+        column = sparse.csc_matrix((np.asarray(values, dtype=float), (list(rows), [0] * len(rows))), shape=(self.rows, 1))
+        self.blocks.append(column)
+        self.costs.append(float(cost))
+        self.columns += 1
+        return self.columns - 1
+
+    def addColumns(self, matrix, first=0, costs=None, extra=None):
+        '''Append patterns first, first + 1, ... of a PatternMatrix as new columns.
+
+        costs[j] is the objective coefficient of pattern first + j (1 when
+        not given) and extra[j] a list of further rows where it has a 1.
+        '''
+        k = len(matrix) - first
+        if k <= 0:
+            return
+
+        indptr = matrix.indptr[first:first + k + 1]
+        lo, hi = int(indptr[0]), int(indptr[-1])
+        block = sparse.csc_matrix((matrix.data[lo:hi].astype(float), matrix.indices[lo:hi], indptr - lo), shape=(self.rows, k))
+        if extra is not None:
+            rows = [row for c in range(k) for row in extra[c]]
+            cols = [c for c in range(k) for _ in extra[c]]
+            if rows:
+                block = block + sparse.csc_matrix((np.ones(len(rows)), (rows, cols)), shape=(self.rows, k))
+        self.blocks.append(block)
+        self.costs.extend([1.0] * k if costs is None else [float(cost) for cost in costs[:k]])
+        self.columns += k
+
+    def matrix(self):
+        '''The constraint matrix (CSC), with every block grown to the current rows.'''
+        if len(self.blocks) != 1 or self.blocks[0].shape[0] != self.rows:
+            for block in self.blocks:
+                block.resize((self.rows, block.shape[1]))
+            self.blocks = [sparse.hstack(self.blocks, format='csc') if self.blocks else sparse.csc_matrix((self.rows, 0))]
+        return self.blocks[0]
+
+    def relax(self):
+        '''Undo solveIP: the next solve is an LP again.'''
+        self.integer = False
+
+    def duals(self):
+        if self.y is None:
+            return [0.0] * self.rows
+        return self.y.tolist()
+
+    def end(self):
+        HighsModel.end(self)
+        self.blocks = []
+
+
+class ArcFlowModel(HighsModel):
+    '''arcflow.ArcFlowModel on HiGHS: the matrix of arcflow.arcFlowProblem as one sparse matrix.'''
+    def __init__(self, graph, piece_amounts, name='cutting-stock-arcflow'):
+        self.graph = graph
+        entries, self.lower, self.upper, self.costs = arcFlowProblem(graph, piece_amounts)
+        self.rows = len(self.lower)
+        self.columns = len(self.costs)
+        self.nonzeros = len(entries)
+        rows, cols, values = zip(*entries) if entries else ((), (), ())
+        self.A = sparse.csc_matrix((np.array(values, dtype=float), (rows, cols)), shape=(self.rows, self.columns))
+        self.reset()
+
+    def matrix(self):
+        return self.A
+
+    def flows(self):
+        return self.primals()
+
+    def end(self):
+        HighsModel.end(self)
+        self.A = None
@@ -0,0 +1,174 @@
+from startup import lazyImport
+
+# pymprog's GLPK bindings (swiglpk) load with the first model
+pymprog = lazyImport('pymprog')
+glpk = lazyImport('swiglpk')
+
+
+def glpkLimits(model, kind, timeLimit=None, gap=None):
+    '''Set GLPK's time limit (seconds) and, for the IP, relative gap for the next solve of kind.
+
+    None clears a limit. GLPK then stops with the best solution found so
+    far; the caller checks the solution status.
+    '''
+    options = {'tm_lim': None if timeLimit is None else max(1, int(timeLimit * 1000))}
+    if kind is int:
+        options['mip_gap'] = None if gap is None else float(gap)
+    model.solver(kind, **options)
+
+
+class MasterProblem:
+    '''Restricted master problem of the column generation, kept alive between iterations.
+
+    One >= row per piece type (== with tight=True); every added pattern becomes
+    a new column of the same GLPK problem, so each re-solve starts from the
+    previous optimal basis instead of building the whole model again.
+    '''
+    def __init__(self, piece_amounts, name='cutting-stock', tight=False):
+        self.model = pymprog.model(name)
+        self.model.set_obj_dir(glpk.GLP_MIN)
+
+        self.row_type = glpk.GLP_FX if tight else glpk.GLP_LO
+        self.rows = len(piece_amounts)
+        self.model.add_rows(self.rows)
+        for i, amount in enumerate(piece_amounts):
+            self.model.set_row_bnds(i + 1, self.row_type, amount, amount)
+
+        self.columns = 0
+        self.integer = False
+        self.returned = None
+        self.ind = glpk.intArray(self.rows + 1)
+        self.val = glpk.doubleArray(self.rows + 1)
+
+    def addRow(self, amount):
+        '''Add a row for a new piece type; the existing columns do not cut it.'''
+        self.model.add_rows(1)
+        self.rows += 1
+        self.model.set_row_bnds(self.rows, self.row_type, amount, amount)
+        self.ind = glpk.intArray(self.rows + 1)
+        self.val = glpk.doubleArray(self.rows + 1)
+
+    def setDemand(self, i, amount):
+        self.model.set_row_bnds(i + 1, self.row_type, amount, amount)
+
+    def addConstraint(self):
+        '''Add an empty, unbounded side constraint row and return its index.'''
+        self.model.add_rows(1)
+        self.rows += 1
+        self.model.set_row_bnds(self.rows, glpk.GLP_FR, 0, 0)
+        self.ind = glpk.intArray(self.rows + 1)
+        self.val = glpk.doubleArray(self.rows + 1)
+        return self.rows - 1
+
+    def setBounds(self, i, lower=None, upper=None):
+        '''Bound row i from below and/or above (None leaves that side open).'''
+        if lower is None and upper is None:
+            kind = glpk.GLP_FR
+        elif upper is None:
+            kind = glpk.GLP_LO
+        elif lower is None:
+            kind = glpk.GLP_UP
+        else:
+            kind = glpk.GLP_FX if lower == upper else glpk.GLP_DB
+        self.model.set_row_bnds(i + 1, kind, float(lower or 0), float(upper or 0))
+
+    def setRow(self, i, columns, values):
+        '''Set the coefficients of row i on the given columns (all others become 0).'''
+        ind = glpk.intArray(len(columns) + 1)
+        val = glpk.doubleArray(len(columns) + 1)
+        for t, (j, a) in enumerate(zip(columns, values)):
+            ind[t + 1] = j + 1
+            val[t + 1] = float(a)
+        self.model.set_mat_row(i + 1, len(columns), ind, val)
+
+    def addColumn(self, rows, values, cost=1.0):
+        '''Append one column with the given non-zeros and return its index.'''
+        j = self.model.add_cols(1)
+        for t, (i, a) in enumerate(zip(rows, values)):
+            self.ind[t + 1] = i + 1
+            self.val[t + 1] = float(a)
+        self.model.set_mat_col(j, len(rows), self.ind, self.val)
+        self.model.set_obj_coef(j, float(cost))
+        self.model.set_col_bnds(j, glpk.GLP_LO, 0, 0)
+        self.columns += 1
+        return self.columns - 1
+
+    def addColumns(self, matrix, first=0, costs=None, extra=None):
+        '''Append patterns first, first + 1, ... of a PatternMatrix as new columns.
+
+        Only the non-zero cut counts are handed to GLPK, so the build time
+        grows with the number of non-zeros. costs[j] is the objective
+        coefficient of pattern first + j (1 when not given) and extra[j] a
+        list of further rows (e.g. stock inventory) where it has a 1.
+        '''
+        k = len(matrix) - first
+        if k <= 0:
+            return
+
+        indptr = matrix.indptr[first:first + k + 1].tolist()
+        indices = (matrix.indices[indptr[0]:indptr[-1]] + 1).tolist()
+        data = matrix.data[indptr[0]:indptr[-1]].tolist()
+        base = indptr[0]
+
+        j = self.model.add_cols(k)
+        for c in range(k):
+            lo, hi = indptr[c] - base, indptr[c + 1] - base
+            for t in range(lo, hi):
+                self.ind[t - lo + 1] = indices[t]
+                self.val[t - lo + 1] = data[t]
+            count = hi - lo
+            for row in (extra[c] if extra is not None else ()):
+                count += 1
+                self.ind[count] = row + 1
+                self.val[count] = 1.0
+            self.model.set_mat_col(j + c, count, self.ind, self.val)
+            self.model.set_obj_coef(j + c, 1.0 if costs is None else float(costs[c]))
+            self.model.set_col_bnds(j + c, glpk.GLP_LO, 0, 0)
+        self.columns += k
+
+    def solveLP(self, timeLimit=None):
+        '''Re-optimize the LP relaxation (warm started) and return its objective.'''
+        glpkLimits(self.model, float, timeLimit)
+        self.returned = self.model.solve(float)[0]
+        return self.model.vobj()
+
+    def timedOut(self):
+        '''Whether GLPK stopped the last solve at its time limit.'''
+        return self.returned == glpk.GLP_ETMLIM
+
+    def feasible(self):
+        '''Whether the last solve found a feasible solution.'''
+        if self.integer:
+            return self.model.mip_status() in (glpk.GLP_OPT, glpk.GLP_FEAS)
+        return self.model.get_status() in (glpk.GLP_OPT, glpk.GLP_FEAS)
+
+    def solveIP(self, timeLimit=None, gap=None):
+        '''Make every column integer and solve the IP on the same problem object.
+
+        The optimal LP basis left by solveLP is the root relaxation, so GLPK's
+        branch-and-bound starts from it. With a time limit or a relative gap
+        it may stop early; feasible() and optimal() tell what it found.
+        '''
+        for j in range(1, self.columns + 1):
+            self.model.set_col_kind(j, glpk.GLP_IV)
+        self.integer = True
+        glpkLimits(self.model, int, timeLimit, gap)
+        self.returned = self.model.solve(int)[0]
+        return self.model.vobj()
+
+    def relax(self):
+        '''Undo solveIP: make every column continuous again for further LP solves.'''
+        for j in range(1, self.columns + 1):
+            self.model.set_col_kind(j, glpk.GLP_CV)
+        self.integer = False
+
+    def duals(self):
+        return [self.model.get_row_dual(i + 1) for i in range(self.rows)]
+
+    def primals(self):
+        if self.integer:
+            return [self.model.mip_col_val(j + 1) for j in range(self.columns)]
+        return [self.model.get_col_prim(j + 1) for j in range(self.columns)]
+
+    def end(self):
+        self.model.end()
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+
+
+# columns of an exported cut plan, one row per piece length of every pattern
+PLAN_FIELDS = ('pattern', 'count', 'stock_length', 'length', 'amount', 'waste')
+
+
+def mergeOrders(orders):
+    '''Merge (length, amount) pairs with equal lengths and sort by length: [(length, amount), ...].
+
+    Rows with a zero amount are dropped; `orders` may be any iterable, so a
+    file is merged while it is read.
+    '''
+    demand = {}
+    for length, amount in orders:
+        length = int(length)
+        amount = int(amount)
+        if length <= 0 or amount < 0:
+            raise ValueError(f'invalid order {length} x {amount}: lengths must be positive, amounts not negative')
+        if amount:
+            demand[length] = demand.get(length, 0) + amount
+    return sorted(demand.items())
+
+
+def _csvOrders(f):
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    if 'length' in names and 'amount' in names:
+        length, amount = names.index('length'), names.index('amount')
+        start = 2
+    else:
+        # no header: the first two columns are length and amount
+        length, amount = 0, 1
+        rows = _chain(header, rows)
+        start = 1
+    for n, row in enumerate(rows, start):
+        if not any(field.strip() for field in row):
+            continue
+        try:
+            yield int(row[length]), int(row[amount])
+        except (ValueError, IndexError):
+            raise ValueError(f'line {n}: {",".join(row)!r} is not a length and an amount') from None
+
+
+def _chain(first, rows):
+    yield first
+    yield from rows
+
+
+def _jsonOrder(order):
+    if isinstance(order, dict):
+        return order['length'], order['amount']
+    return order[0], order[1]
+
+
+def _jsonLinesOrders(f):
+    for n, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield _jsonOrder(json.loads(line))
+        except (ValueError, KeyError, TypeError, IndexError):
+            raise ValueError(f'line {n}: {line.strip()!r} is not an order') from None
+
+
+def _jsonOrders(f):
+    data = json.load(f)
+    if isinstance(data, dict):
+        if 'orders' not in data:
+            return zip(data['sizes'], data['amounts'])
+        data = data['orders']
+    return (_jsonOrder(order) for order in data)
+
+
+def iterOrders(path):
+    '''Yield the (length, amount) rows of an order file, as they are read.
+
+    A .csv file has "length" and "amount" columns (or no header and those
+    two first); a .jsonl/.ndjson file has one [length, amount] pair or
+    {"length": .., "amount": ..} object per line; a .json file is a list of
+    those or a batch job (see batch.parseJob). CSV and JSON lines files are
+    streamed, a .json document is decoded at once.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as f:
+        if extension == '.csv':
+            yield from _csvOrders(f)
+        elif extension in ('.jsonl', '.ndjson'):
+            yield from _jsonLinesOrders(f)
+        elif extension == '.json':
+            try:
+                yield from _jsonOrders(f)
+            except (KeyError, TypeError, IndexError) as e:
+                raise ValueError(f'{path} is not a list of orders or a job ({e})') from None
+        else:
+            raise ValueError(f'{path}: order files are .csv, .json, .jsonl or .ndjson')
+
+
+def readOrders(path):
+    '''The orders of a file with duplicate lengths merged: [(length, amount), ...].'''
+    return mergeOrders(iterOrders(path))
+
+
+def writeOrders(path, orders):
+    '''Write (length, amount) pairs as CSV, or as a JSON list of objects for a .json path.'''
+    with open(path, 'w', newline='') as f:
+        if path.lower().endswith('.json'):
+            json.dump([{'length': length, 'amount': amount} for length, amount in orders], f, indent=2)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(('length', 'amount'))
+            writer.writerows(orders)
+
+
+def writeCutPlan(path, result):
+    '''Export the cut plan of a solver.SolveResult as CSV or, for a .json path, JSON.
+
+    The CSV has one row per piece length of every pattern (PLAN_FIELDS),
+    so it loads into a spreadsheet as it is. The JSON holds the totals and
+    solution.Solution.cutList().
+    '''
+    solution = result.solution()
+    plan = solution.cutList()
+    with open(path, 'w', newline='') as f:
+        if path.lower().endswith('.json'):
+            data = {
+                'objective': result.objective,
+                'stock_used': solution.stockUsed(),
+                'waste': solution.totalWaste(),
+                'stopped_early': result.stopped_early,
+                'patterns': plan,
+            }
+            json.dump(data, f, indent=2)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(PLAN_FIELDS)
+            for j, entry in enumerate(plan, 1):
+                for cut in entry['cuts']:
+                    writer.writerow((j, entry['count'], entry['stock_length'], cut['length'], cut['amount'], entry['waste']))
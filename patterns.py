@@ -0,0 +1,134 @@
+from startup import lazyImport
+
+np = lazyImport('numpy')
+
+
+CHUNK_SIZE = 4096
+
+
+class PatternMatrix:
+    '''Pattern set stored as a sparse column-major (CSC) matrix.
+
+    Column j is pattern j and row i is piece type i: the non-zero cut counts of
+    pattern j are data[indptr[j]:indptr[j + 1]] at rows indices[indptr[j]:indptr[j + 1]].
+    '''
+    def __init__(self, rows, capacity=64):
+        self.rows = rows
+        self.columns = 0
+        self.nnz = 0
+        self.indptr = np.zeros(capacity + 1, dtype=np.int64)
+        self.indices = np.empty(capacity * min(rows, 4), dtype=np.int32)
+        self.data = np.empty(capacity * min(rows, 4), dtype=np.int32)
+
+    def __len__(self):
+        return self.columns
+
+    def _reserve(self, columns, nnz):
+        if self.columns + columns + 1 > len(self.indptr):
+            self.indptr = np.resize(self.indptr, max(2 * len(self.indptr), self.columns + columns + 1))
+        if self.nnz + nnz > len(self.indices):
+            size = max(2 * len(self.indices), self.nnz + nnz)
+            self.indices = np.resize(self.indices, size)
+            self.data = np.resize(self.data, size)
+
+    def addRow(self):
+        '''Add a piece type that none of the existing patterns cut.'''
+        self.rows += 1
+
+    def append(self, pattern):
+        '''Add one dense pattern and return its column index.'''
+        self.extend(np.asarray(pattern, dtype=np.int32).reshape(1, self.rows))
+        return self.columns - 1
+
+    def extend(self, chunk):
+        '''Add every row of a dense (k, rows) pattern array as a column.'''
+        cols, rows = np.nonzero(chunk)
+        k = len(chunk)
+        self._reserve(k, len(rows))
+
+        counts = np.bincount(cols, minlength=k)
+        self.indptr[self.columns + 1:self.columns + k + 1] = self.nnz + np.cumsum(counts)
+        self.indices[self.nnz:self.nnz + len(rows)] = rows
+        self.data[self.nnz:self.nnz + len(rows)] = chunk[cols, rows]
+
+        self.columns += k
+        self.nnz += len(rows)
+
+    def column(self, j):
+        '''Row indices and values of the non-zeros of pattern j.'''
+        lo, hi = self.indptr[j], self.indptr[j + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def dense(self, j):
+        pattern = [0] * self.rows
+        for i, a in zip(*self.column(j)):
+            pattern[i] = int(a)
+        return pattern
+
+    def loads(self, piece_sizes):
+        '''Total length cut by every pattern.'''
+        sizes = np.asarray(piece_sizes, dtype=np.int64)
+        cut = sizes[self.indices[:self.nnz]] * self.data[:self.nnz]
+        owner = np.repeat(np.arange(self.columns), np.diff(self.indptr[:self.columns + 1]))
+        return np.bincount(owner, weights=cut, minlength=self.columns).astype(np.int64)
+
+
+def enumeratePatterns(piece_sizes, stock_length, maximal=True, maxWaste=None, chunk_size=CHUNK_SIZE):
+    '''Generate every feasible cutting pattern, chunk by chunk.
+
+    Yields (patterns, waste) pairs where patterns is an int32 array of shape
+    (k, len(piece_sizes)) and waste the matching trim loss of each row.
+
+    With maximal=True only patterns where no further piece fits are produced;
+    they are the only ones needed when over-production is allowed. maxWaste
+    additionally drops every pattern whose trim loss is larger than it.
+    '''
+    n = len(piece_sizes)
+    limit = stock_length if maxWaste is None else maxWaste
+    if maximal:
+        limit = min(limit, min(piece_sizes) - 1)
+
+    # with maximal patterns the last piece is always cut as often as it fits,
+    # so only the pieces before it are ever decremented
+    last = n - 1 if maximal else n
+
+    patterns = np.empty((chunk_size, n), dtype=np.int32)
+    waste = np.empty(chunk_size, dtype=np.int64)
+    filled = 0
+
+    # room[j] is what is left of the stock before piece j is cut
+    x = [0] * n
+    room = [0] * (n + 1)
+    room[0] = stock_length
+    start = 0
+
+    while True:
+        # greedily fill everything after the piece that was decremented
+        for j in range(start, n):
+            x[j] = room[j] // piece_sizes[j]
+            room[j + 1] = room[j] - x[j] * piece_sizes[j]
+
+        if room[n] <= limit and room[n] < stock_length:
+            patterns[filled] = x
+            waste[filled] = room[n]
+            filled += 1
+            if filled == chunk_size:
+                yield patterns.copy(), waste.copy()
+                filled = 0
+
+        z = last - 1
+        while z >= 0 and not x[z]:
+            z -= 1
+        if z < 0:
+            break
+
+        x[z] -= 1
+        room[z + 1] += piece_sizes[z]
+        start = z + 1
+
+    if filled:
+        yield patterns[:filled].copy(), waste[:filled].copy()
+
+
+def countPatterns(piece_sizes, stock_length, maximal=True, maxWaste=None):
+    return sum(len(chunk) for chunk, _ in enumeratePatterns(piece_sizes, stock_length, maximal, maxWaste))
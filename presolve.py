@@ -0,0 +1,108 @@
+from cache import mapPlan, normalizeOrders
+from math import gcd
+from stock import Stock, isCatalogue
+
+
+def l2Bound(piece_sizes, piece_amounts, stock_length):
+    '''Martello and Toth's L2 lower bound on the stock pieces needed.
+
+    For a threshold K of at most half the stock length, every piece longer
+    than half needs a stock piece of its own, and the pieces of length K up
+    to half can at best fill the room left next to those that are not longer
+    than stock_length - K. The best K is one of the lengths (or 0), and K = 0
+    gives the plain L1 bound ceil(total length / stock length).
+    '''
+    items = [(s, a) for s, a in zip(piece_sizes, piece_amounts) if a]
+    best = 0
+    for k in {0} | {s for s, _ in items if 2 * s <= stock_length}:
+        alone = sum(a for s, a in items if s > stock_length - k)
+        large = [(s, a) for s, a in items if 2 * s > stock_length and s <= stock_length - k]
+        room = sum(a * (stock_length - s) for s, a in large)
+        small = sum(s * a for s, a in items if k <= s and 2 * s <= stock_length)
+        bound = alone + sum(a for _, a in large) + max(0, -(-(small - room) // stock_length))
+        best = max(best, bound)
+    return best
+
+
+class Reduction:
+    '''A cutting-stock instance after presolve, and the way back to the original orders.
+
+    Presolve merges equal lengths (dropping rows with nothing to cut), fixes
+    pieces that fit next to no other piece (including those exactly as long
+    as the stock) in dedicated patterns of one piece each, and divides all
+    lengths by their greatest common divisor, rounding the stock length down:
+    every pattern's load is a multiple of it, so no pattern is lost, and the
+    knapsack tables and the arc-flow graph shrink by that factor.
+
+    piece_sizes, piece_amounts and stock_length (a stock.Stock catalogue
+    when one was given) are what is left to model, in units of `scale`.
+    fixed holds (count, length) of the dedicated patterns and bound the L2
+    bound of what is left (None for a catalogue). Catalogues keep all their
+    pieces, as the cheapest stock type for a piece on its own depends on
+    the inventory, but drop the stock types shorter than every piece (which
+    scaling could turn into length 0); stock_index[k] is the original index
+    of reduced type k (None without a catalogue). fix=False and scale=False
+    skip those steps; drop=False keeps the rows with nothing to cut, which
+    can still fill up a pattern when the objective is waste.
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length, fix=True, scale=True, drop=True):
+        self.original_sizes = list(piece_sizes)
+        self.original_amounts = list(piece_amounts)
+        catalogue = isCatalogue(stock_length)
+        longest = max(s.length for s in stock_length) if catalogue else stock_length
+        orders = [(size, amount) for size, amount in normalizeOrders(piece_sizes, piece_amounts) if amount or not drop]
+
+        self.fixed = []
+        if fix and not catalogue and orders:
+            shortest = orders[0][0]
+            # a row with nothing to cut that fits next to no other piece is of no use
+            self.fixed = [(amount, size) for size, amount in orders if amount and size + shortest > longest]
+            orders = [(size, amount) for size, amount in orders if size + shortest <= longest]
+
+        self.scale = 1
+        if scale and orders:
+            g = 0
+            for size, _ in orders:
+                g = gcd(g, size)
+            self.scale = g
+        self.piece_sizes = [size // self.scale for size, _ in orders]
+        self.piece_amounts = [amount for _, amount in orders]
+        if catalogue:
+            # a type shorter than the scale is shorter than every piece and cuts nothing
+            shortest = min(size for size, _ in orders) if orders else 0
+            self.stock_index = [k for k, s in enumerate(stock_length) if s.length >= shortest]
+            self.stock_length = [Stock(stock_length[k].length // self.scale, stock_length[k].cost, stock_length[k].available) for k in self.stock_index]
+            self.bound = None
+        else:
+            self.stock_index = None
+            self.stock_length = stock_length // self.scale
+            self.bound = l2Bound(self.piece_sizes, self.piece_amounts, self.stock_length)
+
+    def empty(self):
+        '''Whether presolve left nothing to model.'''
+        return not self.piece_sizes
+
+    def fixedStock(self):
+        return sum(count for count, _ in self.fixed)
+
+    def fixedWaste(self, stock_length):
+        return sum(count * (stock_length - size) for count, size in self.fixed)
+
+    def expand(self, patterns, counts, piece_sizes, stock_of=()):
+        '''A solution over the reduced rows of piece_sizes (scaled), plus the
+        dedicated patterns, over the original rows: (patterns, counts, stock_of).
+
+        Pieces of a length the original orders list more than once are
+        shared out by the demand of those rows (see cache.mapPlan), and
+        stock_of indexes the original catalogue.
+        '''
+        lengths = [size * self.scale for size in piece_sizes] + [size for _, size in self.fixed]
+        types = [self.stock_index[k] for k in stock_of] if self.stock_index is not None else [None] * len(patterns)
+        plan = [(count, list(pattern) + [0] * len(self.fixed), k) for count, pattern, k in zip(counts, patterns, types)]
+        for t, (count, _) in enumerate(self.fixed):
+            dedicated = [0] * len(lengths)
+            dedicated[len(piece_sizes) + t] = 1
+            plan.append((count, dedicated, None))
+        plan = mapPlan(plan, lengths, self.original_sizes, self.original_amounts)
+        stock_of = [k for _, _, k in plan] if self.stock_index is not None else []
+        return [pattern for _, pattern, _ in plan], [count for count, _, _ in plan], stock_of
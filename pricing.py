@@ -0,0 +1,231 @@
+from math import gcd
+import heapq
+from startup import lazyImport
+
+np = lazyImport('numpy')
+
+
+# above this many DP cells (item copies x capacity) the branch-and-bound solver is used instead
+DP_CELL_LIMIT = 20_000_000
+
+
+def solveKnapsack(values, sizes, capacity, bounds=None, k=1, exact=True):
+    '''Integer knapsack: maximize sum(values[i] * z[i]) s.t. sum(sizes[i] * z[i]) <= capacity.
+
+    bounds[i] optionally caps z[i] (None means unbounded). Returns a list of
+    at most k (value, pattern) pairs, best first, where pattern[i] = z[i].
+    Only items with a positive value are ever used. With exact=False the
+    k - 1 runners-up may be any other good patterns (see bestPatterns).
+    '''
+    n = len(sizes)
+    items = [i for i in range(n) if values[i] > 0 and sizes[i] <= capacity and (bounds is None or bounds[i] > 0)]
+    if not items:
+        return [(0.0, [0] * n)]
+
+    # all reachable loads are multiples of the gcd, so the capacity can be scaled down
+    g = 0
+    for i in items:
+        g = gcd(g, sizes[i])
+    item_sizes = [sizes[i] // g for i in items]
+    item_values = [float(values[i]) for i in items]
+    item_bounds = [capacity // sizes[i] if bounds is None else min(bounds[i], capacity // sizes[i]) for i in items]
+    cap = capacity // g
+
+    copies = sum(b.bit_length() for b in item_bounds)
+    if (k == 1 or not exact) and copies * (cap + 1) <= DP_CELL_LIMIT:
+        found = _dynamicProgramming(item_values, item_sizes, item_bounds, cap, k)
+    else:
+        found = _branchAndBound(item_values, item_sizes, item_bounds, cap, k)
+
+    results = []
+    for value, counts in found:
+        pattern = [0] * n
+        for i, c in zip(items, counts):
+            pattern[i] = c
+        results.append((value, pattern))
+    return results
+
+
+def bestPattern(values, sizes, capacity, bounds=None):
+    '''Shortcut for the single best (value, pattern) pair.'''
+    return solveKnapsack(values, sizes, capacity, bounds)[0]
+
+
+def bestPatterns(values, sizes, capacity, k, bounds=None):
+    '''Up to k good (value, pattern) pairs, best first, for adding several columns at once.
+
+    They are read off a single dynamic programming table (the best pattern,
+    then the best one with a smaller load, and so on), so they cost about as
+    much as the best pattern alone but are not the exact k best.
+    '''
+    return solveKnapsack(values, sizes, capacity, bounds, k, exact=False)
+
+
+def canonicalOrder(sizes):
+    '''Piece types longest first: the order in which a pattern's pieces are laid along the stock.'''
+    return sorted(range(len(sizes)), key=lambda i: (-sizes[i], i))
+
+
+def patternArcs(pattern, sizes):
+    '''The arcs (i, load) of a pattern's path: a piece of type i cut where `load` of the stock is used up.'''
+    arcs = []
+    load = 0
+    for i in canonicalOrder(sizes):
+        for _ in range(pattern[i]):
+            arcs.append((i, load))
+            load += sizes[i]
+    return arcs
+
+
+def bestPaths(values, sizes, capacity, arc_values=None, k=1):
+    '''Pricing over the arc-flow graph, where every arc may carry a value of its own.
+
+    A pattern is worth sum(values[i] * pattern[i]) plus the arc_values of
+    the arcs of its path (see patternArcs). A longest path dynamic program
+    over the piece types in canonical order and the used length finds the
+    best one; up to k (value, pattern) pairs ending at different loads are
+    returned, best first.
+    '''
+    n = len(sizes)
+    g = 0
+    for size in sizes:
+        g = gcd(g, size)
+    cap = capacity // g
+    order = canonicalOrder(sizes)
+
+    arc_gain = {}
+    for (i, load), value in (arc_values or {}).items():
+        if load % g == 0 and load // g <= cap:
+            arc_gain.setdefault(i, np.zeros(cap + 1))[load // g] += value
+
+    best = np.full(cap + 1, -np.inf)
+    best[0] = 0.0
+    choice = np.zeros((n, cap + 1), dtype=np.int32)
+    for t, i in enumerate(order):
+        w = sizes[i] // g
+        mu = arc_gain.get(i)
+        if values[i] <= 0 and (mu is None or mu.max() <= 0):
+            continue
+
+        new = best.copy()
+        gain = np.zeros(cap + 1)
+        for c in range(1, cap // w + 1):
+            # gain[s] is what c pieces of type i are worth when cut from load s on
+            span = cap - c * w + 1
+            gain[:span] += values[i]
+            if mu is not None:
+                gain[:span] += mu[(c - 1) * w:(c - 1) * w + span]
+            candidate = best[:span] + gain[:span]
+            better = candidate > new[c * w:] + 1e-12
+            new[c * w:][better] = candidate[better]
+            choice[t, c * w:][better] = c
+        best = new
+
+    results = []
+    for end in np.argsort(-best, kind='stable')[:k]:
+        if best[end] == -np.inf:
+            break
+        pattern = [0] * n
+        load = int(end)
+        for t in range(n - 1, -1, -1):
+            c = int(choice[t, load])
+            pattern[order[t]] = c
+            load -= c * (sizes[order[t]] // g)
+        results.append((float(best[end]), pattern))
+    return results
+
+
+def _dynamicProgramming(values, sizes, bounds, capacity, k=1):
+    # binary splitting turns every bounded item into O(log bound) 0/1 items,
+    # each of which is then a single vectorized pass over the capacity axis;
+    # dp[c] is the best value of a load of at most c
+    copy_sizes = []
+    copy_values = []
+    copy_items = []
+    copy_mults = []
+    for i, bound in enumerate(bounds):
+        step = 1
+        while bound > 0:
+            take = min(step, bound)
+            copy_sizes.append(take * sizes[i])
+            copy_values.append(take * values[i])
+            copy_items.append(i)
+            copy_mults.append(take)
+            bound -= take
+            step *= 2
+
+    dp = np.zeros(capacity + 1)
+    keep = np.zeros((len(copy_sizes), capacity + 1), dtype=bool)
+    for c, (w, v) in enumerate(zip(copy_sizes, copy_values)):
+        if w > capacity:
+            continue
+        candidate = dp[:capacity + 1 - w] + v
+        better = candidate > dp[w:]
+        keep[c, w:] = better
+        dp[w:] = np.where(better, candidate, dp[w:])
+
+    # backtrack from the full capacity, then from just below the load of the
+    # pattern found, which gives the best pattern with a smaller load
+    found = []
+    top = capacity
+    while len(found) < k and top >= 0:
+        counts = [0] * len(sizes)
+        c = top
+        for j in range(len(copy_sizes) - 1, -1, -1):
+            if keep[j, c]:
+                counts[copy_items[j]] += copy_mults[j]
+                c -= copy_sizes[j]
+        if found and not any(counts):
+            break
+        found.append((float(dp[top]), counts))
+        top = sum(counts[i] * sizes[i] for i in range(len(sizes))) - 1
+    return found
+
+
+def _branchAndBound(values, sizes, bounds, capacity, k):
+    # depth-first search over items in decreasing value density, pruned with
+    # the linear relaxation bound against the k-th best pattern found so far
+    order = sorted(range(len(sizes)), key=lambda i: values[i] / sizes[i], reverse=True)
+    v = [values[i] for i in order]
+    w = [sizes[i] for i in order]
+    b = [bounds[i] for i in order]
+    n = len(order)
+
+    best = []  # min-heap of (value, counts) holding the k best patterns
+    counts = [0] * n
+
+    def relaxation(pos, room):
+        bound = 0.0
+        for i in range(pos, n):
+            if room <= 0:
+                break
+            take = min(b[i], room / w[i])
+            bound += take * v[i]
+            room -= take * w[i]
+        return bound
+
+    def search(pos, room, value):
+        if pos == n:
+            if len(best) < k:
+                heapq.heappush(best, (value, counts[:]))
+            elif value > best[0][0]:
+                heapq.heapreplace(best, (value, counts[:]))
+            return
+
+        if len(best) == k and value + relaxation(pos, room) <= best[0][0] + 1e-12:
+            return
+
+        for c in range(min(b[pos], room // w[pos]), -1, -1):
+            counts[pos] = c
+            search(pos + 1, room - c * w[pos], value + c * v[pos])
+        counts[pos] = 0
+
+    search(0, capacity, 0.0)
+
+    results = []
+    for value, found in sorted(best, key=lambda t: t[0], reverse=True):
+        original = [0] * n
+        for pos, i in enumerate(order):
+            original[i] = found[pos]
+        results.append((value, original))
+    return results
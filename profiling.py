@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from startup import lazyImport
+from time import perf_counter
+
+# only loaded by solves that are profiled with code=True or memory=True
+cProfile = lazyImport('cProfile')
+pstats = lazyImport('pstats')
+tracemalloc = lazyImport('tracemalloc')
+
+
+TOP_FUNCTIONS = 25
+
+
+class Profile:
+    '''Phase timers and counters of one solve.
+
+    Phases may nest (the 'lp' and 'pricing' phases run inside 'patterns') and
+    may be entered many times; seconds and calls add up per name. Counters
+    hold sizes and totals, iterations one entry per column generation
+    iteration. With code=True the solve also runs under cProfile, with
+    memory=True under tracemalloc (Python allocations only, GLPK's own memory
+    is not seen).
+    '''
+    def __init__(self, code=False, memory=False):
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self.iterations = []
+        self.profiler = cProfile.Profile() if code else None
+        self.memory = memory
+        self.peak_memory = None
+        self.functions = None
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0) + perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def iteration(self, **data):
+        self.iterations.append(data)
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        else:
+            self.memory = False
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.functions = topFunctions(self.profiler)
+            self.profiler = None
+        if self.memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.memory = False
+
+    def timings(self):
+        return dict(self.seconds)
+
+    def report(self):
+        '''Everything recorded, as a JSON-serializable dict.'''
+        report = {
+            'phases': {name: {'seconds': seconds, 'calls': self.calls[name]} for name, seconds in self.seconds.items()},
+            'counters': dict(self.counters),
+            'iterations': list(self.iterations),
+        }
+        if self.functions is not None:
+            report['functions'] = self.functions
+        if self.peak_memory is not None:
+            report['peak_memory_mb'] = round(self.peak_memory / (1024 * 1024), 3)
+        return report
+
+
+def topFunctions(profiler, limit=TOP_FUNCTIONS):
+    '''The functions with the largest cumulative time, as dicts.'''
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f'{filename}:{line}({function})', 'calls': calls, 'seconds': own, 'cumulative': cumulative})
+    rows.sort(key=lambda row: row['cumulative'], reverse=True)
+    return rows[:limit]
+
+
+def summary(report):
+    '''One line with the main phases of a report, e.g. for the GUI.'''
+    phases = report.get('phases', {})
+    parts = []
+    for name, label in (('enumerate', 'enumeration'), ('build', 'model build'), ('lp', 'LP'), ('pricing', 'pricing'), ('heuristics', 'heuristics'), ('ip', 'IP')):
+        if name in phases:
+            parts.append(f'{label} {phases[name]["seconds"]:.3f}s')
+    if 'iterations' in report and report['iterations']:
+        parts.append(f'{len(report["iterations"])} iterations')
+    return ', '.join(parts)
@@ -0,0 +1,382 @@
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import sys
+import threading
+from time import time
+from urllib.parse import urlsplit
+import uuid
+
+import batch
+from cache import digest, normalizeOrders
+from stock import isCatalogue
+import worker
+
+
+DEFAULT_PORT = 8750
+# how often the dispatcher collects worker progress, in seconds
+POLL_INTERVAL = 0.05
+# seconds between keep-alive comments on an idle event stream
+KEEPALIVE = 15
+
+# the solver options a request may set
+OPTIONS = ('useLoss', 'useTight', 'maxWaste', 'useHeuristics', 'columns', 'stabilization', 'gap', 'branchAndPrice', 'nodeLimit', 'timeLimit', 'mipGap', 'presolve', 'backend')
+FINISHED = ('solved', 'failed', 'cancelled')
+
+
+def _jsonDefault(value):
+    # numpy scalars in progress events
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def dumps(data):
+    return json.dumps(data, default=_jsonDefault)
+
+
+class ServiceJob:
+    '''One submitted job: its request, status, progress events and result.'''
+    def __init__(self, job, method, options, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = job.name
+        self.args = (job.piece_sizes, job.piece_amounts, job.stock_length, method)
+        self.options = options
+        self.key = key
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created = time()
+        self.started = None
+        self.finished = None
+
+    def done(self):
+        return self.status in FINISHED
+
+    def summary(self):
+        last = next((event for event in reversed(self.events) if event['event'] == 'iteration'), None)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'method': self.args[3],
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'events': len(self.events),
+            'progress': last,
+            'objective': self.result['objective'] if self.result else None,
+            'stopped_early': self.result['stopped_early'] if self.result else None,
+            'error': self.error,
+        }
+
+
+class SolveService:
+    '''Job queue in front of a bounded pool of solver processes.
+
+    Jobs run first come, first served on at most `workers` worker.SolverWorker
+    processes at once; at most `max_queue` wait. A job identical to one that
+    is queued, running or solved (same merged orders, stock, method and
+    options) is answered with that job. One dispatcher thread owns the
+    workers and drives them without holding the lock; everything else only
+    touches jobs under it (a cancel just flags the job for the dispatcher)
+    and is woken through the `changed` condition. At most `keep` finished
+    jobs are kept.
+    '''
+    def __init__(self, workers=2, max_queue=100, keep=1000, cache_dir=None, time_limit=None):
+        self.workers = [worker.SolverWorker(incremental=False, cache_dir=cache_dir, quiet=True) for _ in range(workers)]
+        self.running = [None] * workers
+        self.max_queue = max_queue
+        self.keep = keep
+        self.time_limit = time_limit
+        self.jobs = {}
+        self.queue = []
+        self.keys = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.stopping = False
+        self.thread = None
+
+    def start(self):
+        for w in self.workers:
+            w.start()
+        self.thread = threading.Thread(target=self.dispatch, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+            self.changed.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        for w in self.workers:
+            w.close()
+
+    def submit(self, job, method=2, options=None):
+        '''Queue a batch.Job; returns (ServiceJob, whether it is new).
+
+        Raises ValueError for unknown options (or maxWaste with a method
+        other than 1) and OverflowError when the queue is full.
+        '''
+        options = dict(options or {})
+        unknown = set(options) - set(OPTIONS)
+        if unknown:
+            raise ValueError(f'unknown options: {", ".join(sorted(unknown))}')
+        if options.get('maxWaste') is not None and method != 1:
+            raise ValueError('maxWaste is only supported by method 1')
+        if self.time_limit is not None:
+            options['timeLimit'] = min(options.get('timeLimit') or self.time_limit, self.time_limit)
+        stock = [s.asDict() for s in job.stock_length] if isCatalogue(job.stock_length) else job.stock_length
+        key = digest({'orders': normalizeOrders(job.piece_sizes, job.piece_amounts), 'stock': stock, 'method': method, 'options': options})
+
+        with self.lock:
+            existing = self.jobs.get(self.keys.get(key))
+            if existing is not None and existing.status in ('queued', 'running', 'solved'):
+                return existing, False
+            if len(self.queue) >= self.max_queue:
+                raise OverflowError('the job queue is full')
+            entry = ServiceJob(job, method, options, key)
+            self.jobs[entry.id] = entry
+            self.keys[key] = entry.id
+            self.queue.append(entry)
+            self.changed.notify_all()
+        return entry, True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return [job.summary() for job in self.jobs.values()]
+
+    def cancel(self, job_id):
+        '''Cancel a job: a queued one is dropped, a running one stops with its best solution so far.'''
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.done():
+                return job
+            if job.status == 'queued':
+                self.queue.remove(job)
+                self.finish(job, 'cancelled', {'event': 'finished', 'status': 'cancelled', 'message': 'Cancelled before it started.\n'})
+            else:
+                # the dispatcher passes it on to the worker
+                job.cancel_requested = True
+            return job
+
+    def finish(self, job, status, event):
+        job.status = status
+        job.finished = time()
+        job.events.append(event)
+        self.changed.notify_all()
+
+        finished = [j for j in self.jobs.values() if j.done()]
+        for old in sorted(finished, key=lambda j: j.finished)[:max(0, len(finished) - self.keep)]:
+            del self.jobs[old.id]
+            if self.keys.get(old.key) == old.id:
+                del self.keys[old.key]
+
+    def dispatch(self):
+        while True:
+            with self.lock:
+                if self.stopping:
+                    return
+                started = []
+                for k in range(len(self.workers)):
+                    if self.running[k] is None and self.queue:
+                        job = self.running[k] = self.queue.pop(0)
+                        job.status = 'running'
+                        job.started = time()
+                        started.append(k)
+                if started:
+                    self.changed.notify_all()
+                running = [(k, job, job.cancel_requested) for k, job in enumerate(self.running) if job is not None]
+
+            # starting a worker may spawn its process and polling one may kill
+            # it after its cancel grace period, so the lock is not held here
+            polled = []
+            for k, job, cancel in running:
+                w = self.workers[k]
+                if k in started:
+                    w.solve(*job.args, **job.options)
+                if cancel:
+                    w.cancel()
+                polled.append((k, job, w.events()))
+
+            with self.lock:
+                for k, job, events in polled:
+                    for event in events:
+                        if event['event'] == 'result':
+                            job.result = event['result']
+                            status = 'cancelled' if job.cancel_requested else 'solved'
+                            self.finish(job, status, {'event': 'finished', 'status': status, 'message': event['message']})
+                        elif event['event'] == 'failed':
+                            job.error = event['message'].strip()
+                            status = 'cancelled' if event['stopped'] else 'failed'
+                            self.finish(job, status, {'event': 'finished', 'status': status, 'message': event['message']})
+                        else:
+                            job.events.append(event)
+                    if job.done():
+                        self.running[k] = None
+                    if events:
+                        self.changed.notify_all()
+                self.changed.wait(POLL_INTERVAL)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    '''The HTTP side of a SolveService.
+
+    POST /jobs                submit a job (a batch job object, see batch.parseJob,
+                              with optional "method" and "options")
+    GET  /jobs                every job's status
+    GET  /jobs/<id>           one job's status and last iteration
+    GET  /jobs/<id>/result    its SolveResult as a dict
+    GET  /jobs/<id>/events    its progress as server-sent events, replayed from the start
+    DELETE /jobs/<id>         cancel it (POST /jobs/<id>/cancel works too)
+    '''
+    server_version = 'CuttingStock/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def reply(self, code, data):
+        body = dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self):
+        parts = [part for part in urlsplit(self.path).path.split('/') if part]
+        if not parts or parts[0] != 'jobs':
+            return None, None
+        job = None
+        if len(parts) > 1:
+            job = self.service.get(parts[1])
+            if job is None:
+                self.reply(404, {'error': f'no job {parts[1]}'})
+                return False, None
+        return parts[1:], job
+
+    def do_GET(self):
+        parts, job = self.route()
+        if parts is False:
+            return
+        if parts == []:
+            self.reply(200, {'jobs': self.service.list()})
+        elif parts is not None and len(parts) == 1:
+            self.reply(200, job.summary())
+        elif parts is not None and parts[1:] == ['result']:
+            if job.result is None:
+                self.reply(409, {'error': job.error or f'the job is {job.status}', 'status': job.status})
+            else:
+                self.reply(200, job.result)
+        elif parts is not None and parts[1:] == ['events']:
+            self.streamEvents(job)
+        else:
+            self.reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts, job = self.route()
+        if parts is False:
+            return
+        if parts == []:
+            self.submitJob()
+        elif parts is not None and parts[1:] == ['cancel']:
+            self.reply(200, self.service.cancel(job.id).summary())
+        else:
+            self.reply(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts, job = self.route()
+        if parts is False:
+            return
+        if parts is not None and len(parts) == 1:
+            self.reply(200, self.service.cancel(job.id).summary())
+        else:
+            self.reply(404, {'error': 'not found'})
+
+    def submitJob(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length) or b'{}')
+            job = batch.parseJob('job', data)
+            entry, created = self.service.submit(job, job.method or 2, data.get('options'))
+        except OverflowError as e:
+            self.reply(503, {'error': str(e)})
+            return
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            self.reply(400, {'error': f'invalid job: {e}'})
+            return
+        self.reply(201 if created else 200, dict(entry.summary(), duplicate=not created))
+
+    def streamEvents(self, job):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        condition = self.service.changed
+        sent = 0
+        while True:
+            with condition:
+                if sent >= len(job.events) and not job.done():
+                    condition.wait(KEEPALIVE)
+                events = job.events[sent:]
+                done = job.done()
+            try:
+                if not events and not done:
+                    self.wfile.write(b': keep-alive\n\n')
+                for event in events:
+                    self.wfile.write(f'event: {event["event"]}\ndata: {dumps(event)}\n\n'.encode())
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            sent += len(events)
+            if done and sent >= len(job.events):
+                return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the cutting-stock solver over HTTP/JSON on this machine.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT, help=f'port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('-j', '--workers', type=int, default=2, help='solver processes, i.e. jobs solved at once (default: 2)')
+    parser.add_argument('--max-queue', type=int, default=100, help='jobs that may wait for a worker (default: 100)')
+    parser.add_argument('--keep', type=int, default=1000, help='finished jobs kept for status and result requests (default: 1000)')
+    parser.add_argument('--time-limit', type=float, default=None, help='upper bound on every job\'s solver time limit in seconds')
+    parser.add_argument('--cache', default=None, metavar='DIR', help='solution cache directory (default: ~/.cache/cutting-stock)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not log every request')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1 or args.max_queue < 0:
+        print('--workers must be positive and --max-queue not negative', file=sys.stderr)
+        return batch.EXIT_USAGE
+
+    service = SolveService(args.workers, args.max_queue, args.keep, args.cache, args.time_limit)
+    server = ThreadingHTTPServer((args.host, args.port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = args.quiet
+    service.start()
+    print(f'Listening on http://{args.host}:{server.server_port}/jobs', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return batch.EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
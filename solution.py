@@ -0,0 +1,77 @@
+from startup import lazyImport
+
+np = lazyImport('numpy')
+
+
+class Solution:
+    '''A cutting plan in contiguous arrays.
+
+    Each of the counts[j] stock pieces of length stock_lengths[j] is cut
+    into cuts[j, i] pieces of piece_sizes[i]; cuts is one C-contiguous
+    (patterns, lengths) int32 array. Everything is computed per pattern, so
+    the work grows with the number of patterns and never with the number
+    of pieces cut.
+    '''
+    __slots__ = ('piece_sizes', 'cuts', 'counts', 'stock_lengths')
+
+    def __init__(self, piece_sizes, cuts, counts, stock_lengths):
+        self.piece_sizes = np.asarray(piece_sizes, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.cuts = np.ascontiguousarray(np.asarray(cuts, dtype=np.int32).reshape(len(self.counts), len(self.piece_sizes)))
+        self.stock_lengths = np.broadcast_to(np.asarray(stock_lengths, dtype=np.int64), self.counts.shape).copy()
+
+    @classmethod
+    def fromResult(cls, result):
+        '''The patterns of a solver.SolveResult that are used at least once.'''
+        used = [j for j, count in enumerate(result.counts) if count]
+        if result.stock is not None:
+            lengths = [result.stock[result.stock_of[j]].length for j in used]
+        else:
+            lengths = result.stock_length
+        return cls(result.piece_sizes, [result.patterns[j] for j in used], [result.counts[j] for j in used], lengths)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def loads(self):
+        '''Length cut from one stock piece of every pattern.'''
+        return self.cuts @ self.piece_sizes
+
+    def waste(self):
+        '''Trim loss of one stock piece of every pattern.'''
+        return self.stock_lengths - self.loads()
+
+    def totalWaste(self):
+        return int(self.counts @ self.waste())
+
+    def stockUsed(self):
+        return int(self.counts.sum())
+
+    def produced(self):
+        '''Pieces cut of every length.'''
+        return self.counts @ self.cuts
+
+    def cutList(self):
+        '''One dict per pattern: how many stock pieces of which length, the cuts and the trim loss.'''
+        waste = self.waste().tolist()
+        plan = []
+        for j, (count, length) in enumerate(zip(self.counts.tolist(), self.stock_lengths.tolist())):
+            row = self.cuts[j]
+            pieces = [{'length': int(self.piece_sizes[i]), 'amount': int(row[i])} for i in np.flatnonzero(row)]
+            plan.append({'count': count, 'stock_length': length, 'cuts': pieces, 'waste': waste[j]})
+        return plan
+
+    def summary(self, show_stock=False):
+        '''One line per pattern, e.g. "3 x (2 x 1380 + 2200), waste 640".
+
+        Repeated pieces are written as amount x length. With show_stock the
+        stock length is written before the cuts.
+        '''
+        waste = self.waste().tolist()
+        lines = []
+        for j, (count, length) in enumerate(zip(self.counts.tolist(), self.stock_lengths.tolist())):
+            row = self.cuts[j]
+            terms = [str(size) if amount == 1 else f'{amount} x {size}' for size, amount in zip(self.piece_sizes[row > 0].tolist(), row[row > 0].tolist())]
+            stock = f'{length}: ' if show_stock else ''
+            lines.append(f'{count} x {stock}({" + ".join(terms)}), waste {waste[j]}\n')
+        return ''.join(lines)
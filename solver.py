@@ -0,0 +1,1044 @@
+import arcflow
+import backends
+from branchprice import BranchAndPrice
+import copy
+from math import ceil
+import heuristics
+import patterns
+import presolve
+import pricing
+from profiling import Profile
+from solution import Solution
+from startup import lazyImport
+from stock import Stock, isCatalogue
+from time import perf_counter
+
+futures = lazyImport('concurrent.futures')
+np = lazyImport('numpy')
+
+
+def dot(values, pattern):
+    return sum(v * a for v, a in zip(values, pattern) if a)
+
+
+def lowerBound(lp_bound):
+    '''Fewest stock pieces an integer solution can use, given the LP bound.'''
+    return ceil(lp_bound - 1e-6)
+
+
+class SolveStopped(Exception):
+    '''The solve was cancelled or ran out of time before it had any solution.'''
+
+
+class SolveResult:
+    '''Outcome of a cutting-stock solve.
+
+    patterns[j][i] is how many pieces of piece_sizes[i] pattern j cuts and
+    counts[j] is how many stock pieces are cut with pattern j. Only the
+    patterns the solution actually uses are kept.
+
+    With a stock catalogue, stock is the list of Stock types, stock_of[j] the
+    index of the type pattern j is cut from, stock_length the longest length
+    and objective the total cost. With minimize_waste (useLoss with method
+    1) objective and lp_bound are the total waste instead of stock pieces.
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length, method, stock=None):
+        self.piece_sizes = piece_sizes
+        self.piece_amounts = piece_amounts
+        self.stock_length = stock_length
+        self.method = method
+        self.stock = stock
+        self.patterns = []
+        self.counts = []
+        self.stock_of = []
+        self.minimize_waste = False
+        self.objective = None
+        self.lp_bound = None
+        self.stopped_early = False
+        self.cached = False
+        self.heuristic = None
+        self.bound = None
+        self.timings = {}
+        self.profile = None
+
+    @classmethod
+    def fromDict(cls, data):
+        stock = [Stock.fromDict(entry) for entry in data['stock']] if data.get('stock') else None
+        result = cls(data['piece_sizes'], data['piece_amounts'], data['stock_length'], data['method'], stock)
+        result.objective = data['objective']
+        result.lp_bound = data['lp_bound']
+        result.stopped_early = data['stopped_early']
+        result.heuristic = data.get('heuristic')
+        result.bound = data.get('bound')
+        result.minimize_waste = data.get('minimize_waste', False)
+        result.patterns = [entry['cuts'] for entry in data['patterns']]
+        result.counts = [entry['count'] for entry in data['patterns']]
+        if stock is not None:
+            result.stock_of = [entry['stock'] for entry in data['patterns']]
+        result.timings = dict(data['timings'])
+        return result
+
+    def usedPatterns(self):
+        return [(count, pattern) for count, pattern in zip(self.counts, self.patterns) if count]
+
+    def stockUsed(self):
+        return sum(self.counts)
+
+    def solution(self):
+        '''The used patterns as an array-backed solution.Solution.'''
+        return Solution.fromResult(self)
+
+    def gap(self):
+        '''Stock pieces above the best proven lower bound (0 means proven optimal).
+
+        That is the rounded up LP bound, or the bound of a branch-and-price
+        search or presolve's L2 bound when it is higher. With a stock
+        catalogue it is the cost above the LP bound instead, and with
+        minimize_waste the waste above it; None when there is no LP bound.
+        '''
+        if self.stock is not None or self.minimize_waste:
+            return None if self.lp_bound is None else round(self.objective - self.lp_bound, 6)
+        if self.lp_bound is None and self.bound is None:
+            return None
+        return self.stockUsed() - max(0 if self.lp_bound is None else lowerBound(self.lp_bound), self.bound or 0)
+
+    def asDict(self):
+        entries = []
+        for j, (count, pattern) in enumerate(zip(self.counts, self.patterns)):
+            if count:
+                entry = {'count': count, 'cuts': list(pattern)}
+                if self.stock is not None:
+                    entry['stock'] = self.stock_of[j]
+                entries.append(entry)
+        return {
+            'piece_sizes': list(self.piece_sizes),
+            'piece_amounts': list(self.piece_amounts),
+            'stock_length': self.stock_length,
+            'stock': None if self.stock is None else [stock.asDict() for stock in self.stock],
+            'method': self.method,
+            'objective': self.objective,
+            'lp_bound': self.lp_bound,
+            'stock_used': self.stockUsed(),
+            'stopped_early': self.stopped_early,
+            'minimize_waste': self.minimize_waste,
+            'heuristic': self.heuristic,
+            'bound': self.bound,
+            'gap': self.gap(),
+            'patterns': entries,
+            'timings': dict(self.timings),
+            'profile': self.profile,
+        }
+
+
+class CuttingStockSolver:
+    '''Headless cutting-stock engine.
+
+    Progress is reported through the optional `progress` callable, which is
+    called with one dict per event. Every event has an 'event' name and a
+    human readable 'message'; other keys depend on the event.
+
+    Method 1 solves the IP over every pattern (solveAllPatterns), method 2
+    generates the patterns by column generation (solveColumnGeneration, or
+    solveCatalogue when stock_length is a list of stock.Stock types) and
+    method 3 solves the arc-flow model (solveArcFlow). A fresh solve is
+    presolved first (solvePresolved), and before an IP is solved a few
+    heuristics try to reach the rounded up LP bound. solve() describes the
+    limits, the cache and the profile; the options are listed in the
+    README's "Without the GUI" section.
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length, method=1, useLoss=0, useTight=0, progress=None, maxWaste=None, cache=None, useHeuristics=True, profileCode=False, traceMemory=False, columns=5, stabilization=0.5, gap=None, branchAndPrice=False, nodeLimit=None, timeLimit=None, mipGap=None, cancel=None, presolve=True, backend='glpk'):
+        piece_sizes = [int(s) for s in piece_sizes]
+        piece_amounts = [int(a) for a in piece_amounts]
+
+        if not piece_sizes or len(piece_sizes) != len(piece_amounts):
+            raise ValueError('piece_sizes and piece_amounts must be non-empty and of equal length')
+        stock = None
+        if isCatalogue(stock_length):
+            stock = [entry if isinstance(entry, Stock) else Stock.fromDict(entry) for entry in stock_length]
+            if not stock:
+                raise ValueError('the stock catalogue is empty')
+            if method == 3:
+                raise ValueError('method 3 does not support a stock catalogue')
+            stock_length = max(entry.length for entry in stock)
+        if stock_length <= 0 or any(s <= 0 for s in piece_sizes):
+            raise ValueError('lengths must be positive')
+        if any(s > stock_length for s in piece_sizes):
+            raise ValueError('every piece must fit in the stock length')
+        if method not in (1, 2, 3):
+            raise ValueError(f'unknown method {method!r}')
+        if maxWaste is not None and method != 1:
+            raise ValueError('maxWaste is only supported by method 1')
+        if columns < 1 or not 0 <= stabilization < 1 or (gap is not None and gap < 0):
+            raise ValueError('columns must be positive, stabilization in [0, 1) and gap not negative')
+        if (timeLimit is not None and timeLimit <= 0) or (mipGap is not None and mipGap < 0):
+            raise ValueError('timeLimit must be positive and mipGap not negative')
+        backends.checkBackend(backend)
+
+        self.piece_sizes = piece_sizes
+        self.piece_amounts = piece_amounts
+        self.stock_length = int(stock_length)
+        self.stock = stock
+        self.method = method
+        self.useLoss = useLoss
+        self.useTight = useTight
+        self.maxWaste = maxWaste
+        self.progress = progress
+        self.cache = cache
+        self.useHeuristics = useHeuristics
+        self.profileCode = profileCode
+        self.traceMemory = traceMemory
+        self.columns = columns
+        self.stabilization = stabilization
+        self.gap = gap
+        self.branchAndPrice = branchAndPrice
+        self.nodeLimit = nodeLimit
+        self.timeLimit = timeLimit
+        self.mipGap = mipGap
+        self.cancel = cancel
+        self.presolve = presolve
+        self.backend = backend
+        self.deadline = None
+        self.stopped = None
+        self.profile = None
+
+    def options(self):
+        options = {'method': self.method, 'useLoss': int(self.useLoss), 'useTight': int(self.useTight), 'maxWaste': self.maxWaste, 'gap': self.gap, 'branchAndPrice': bool(self.branchAndPrice), 'mipGap': self.mipGap}
+        if self.stock is not None:
+            options['stock'] = [stock.asDict() for stock in self.stock]
+        return options
+
+    def minimizesWaste(self):
+        '''Whether the objective is waste rather than stock (useLoss, which only method 1 models).'''
+        return bool(self.useLoss) and self.method == 1
+
+    def emit(self, event, message='', **data):
+        if self.progress is not None:
+            data['event'] = event
+            data['message'] = message
+            self.progress(data)
+
+    def stopRequested(self):
+        '''Checkpoint: whether the solve was cancelled or is out of time.'''
+        if self.stopped is None:
+            if self.cancel is not None and self.cancel.is_set():
+                self.stop('cancelled')
+            elif self.deadline is not None and perf_counter() >= self.deadline:
+                self.stop('time limit')
+        return self.stopped is not None
+
+    def stop(self, reason):
+        if self.stopped is None:
+            self.stopped = reason
+            self.emit('stopped', f' Stopped ({reason})...', reason=reason)
+
+    def timeLeft(self):
+        '''Seconds the LP/MIP backend may still run, None without a time limit.'''
+        if self.deadline is None:
+            return None
+        return max(0.001, self.deadline - perf_counter())
+
+    def solve(self, state=None):
+        '''Solve and return a SolveResult.
+
+        state is a ColumnGenerationState to continue from (method 2 only).
+        timeLimit (seconds of wall clock for the whole solve) is passed down
+        to every LP/MIP call as its remaining time and mipGap is the IP's
+        relative gap; cancel (e.g. a threading.Event) is checked between
+        column generation iterations, pattern chunks and branch-and-price
+        nodes, as the backend itself cannot be interrupted. When a limit
+        hits, the best solution at hand is returned with
+        result.stopped_early set (see fallbackSolution). With a
+        cache.SolveCache, a job solved before is answered from it. The solve
+        is measured with a profiling.Profile, whose report ends up in
+        result.profile and in a final 'profile' event.
+        '''
+        self.profile = Profile(self.profileCode, self.traceMemory)
+        self.deadline = None if self.timeLimit is None else perf_counter() + self.timeLimit
+        self.stopped = None
+        self.profile.start()
+        try:
+            with self.profile.phase('total'):
+                result = self.solveProfiled(state)
+        finally:
+            self.profile.stop()
+
+        result.stopped_early = result.stopped_early or self.stopped is not None
+        result.timings = self.profile.timings()
+        result.profile = self.profile.report()
+        self.emit('profile', profile=result.profile)
+
+        if self.cache is not None and not result.cached and not result.stopped_early:
+            self.cache.storeSolution(result, self.options())
+
+        return result
+
+    def solveProfiled(self, state):
+        if self.cache is not None:
+            data = self.cache.loadSolution(self.piece_sizes, self.piece_amounts, self.stock_length, self.options())
+            if data is not None:
+                result = SolveResult.fromDict(data)
+                result.cached = True
+                self.emit('cache_hit', f'Found a cached solution where Z = {result.objective:.2f}\n', objective=result.objective)
+                return result
+
+        self.profile.set('backend', self.backend)
+        if self.presolve and state is None:
+            return self.solvePresolved()
+
+        result = SolveResult(self.piece_sizes, self.piece_amounts, self.stock_length, self.method, self.stock)
+        result.minimize_waste = self.minimizesWaste()
+        if self.method == 1:
+            self.solveAllPatterns(result)
+        elif self.stock is not None:
+            self.solveCatalogue(result)
+        elif self.method == 2:
+            self.solveColumnGeneration(result, state)
+        else:
+            self.solveArcFlow(result)
+        return result
+
+    def solvePresolved(self):
+        '''Presolve, solve what is left and map its solution back onto the original orders.
+
+        presolve.Reduction merges equal lengths, gives pieces that fit next
+        to no other piece dedicated patterns and divides the lengths by their
+        common divisor (not with useLoss or maxWaste, whose waste is in
+        original units). When first-fit decreasing already reaches the L2
+        bound of what is left, no model is built at all.
+        '''
+        profile = self.profile
+        with profile.phase('presolve'):
+            # a dedicated pattern may waste more than maxWaste allows, and
+            # pieces nobody ordered still cut down the waste of a pattern
+            reduction = presolve.Reduction(self.piece_sizes, self.piece_amounts, self.stock_length if self.stock is None else self.stock, fix=self.maxWaste is None, scale=not self.useLoss and self.maxWaste is None, drop=not self.minimizesWaste())
+        fixed = reduction.fixedStock()
+        # the L2 bound counts stock pieces, so it says nothing about waste
+        bound = None if reduction.bound is None or self.minimizesWaste() else reduction.bound + fixed
+        profile.set('presolve_rows', len(reduction.piece_sizes))
+        profile.set('presolve_fixed', fixed)
+        profile.set('presolve_scale', reduction.scale)
+        message = f'Presolve: {len(reduction.piece_sizes)} lengths to model'
+        if fixed:
+            message += f', {fixed} pieces cut on their own'
+        if reduction.scale > 1:
+            message += f', lengths divided by {reduction.scale}'
+        if bound is not None:
+            message += f', at least {bound} stock pieces'
+        self.emit('presolved', message + '.\n', rows=len(reduction.piece_sizes), fixed=fixed, scale=reduction.scale, bound=bound)
+
+        reduced = None
+        if reduction.empty():
+            reduced = SolveResult([], [], reduction.stock_length, self.method)
+            reduced.objective = reduced.lp_bound = 0.0
+        elif bound is not None and self.useHeuristics and self.maxWaste is None:
+            with profile.phase('heuristics'):
+                packing = heuristics.firstFitDecreasing(reduction.piece_sizes, reduction.piece_amounts, reduction.stock_length)
+            if packing.stockUsed() <= reduction.bound:
+                reduced = SolveResult(reduction.piece_sizes, reduction.piece_amounts, reduction.stock_length, self.method)
+                self.acceptHeuristic(reduced, packing)
+                self.emit('solved', f'Z = {packing.stockUsed() + fixed:.2f} (the {packing.name} heuristic reached the L2 bound)\n', objective=float(packing.stockUsed() + fixed))
+
+        if reduced is None:
+            inner = copy.copy(self)
+            inner.piece_sizes = reduction.piece_sizes
+            inner.piece_amounts = reduction.piece_amounts
+            if self.stock is None:
+                inner.stock_length = reduction.stock_length
+            else:
+                inner.stock = reduction.stock_length
+                inner.stock_length = max(s.length for s in inner.stock)
+            inner.presolve = False
+            try:
+                reduced = inner.solveProfiled(None)
+            finally:
+                self.stopped = inner.stopped
+
+        result = SolveResult(self.piece_sizes, self.piece_amounts, self.stock_length, self.method, self.stock)
+        expandResult(reduction, reduced, result, self.minimizesWaste())
+        if fixed and not reduction.empty():
+            self.emit('postsolved', f'With the {fixed} stock pieces fixed by presolve Z = {result.objective:.2f}\n', objective=result.objective)
+        return result
+
+    def solveAllPatterns(self, result):
+        '''Method 1: the IP over every pattern (of every type in one pass over a catalogue).
+
+        useLoss minimizes the waste instead of the stock used, useTight cuts
+        exactly the ordered amounts and maxWaste leaves out the patterns
+        that waste more than that.
+        '''
+        profile = self.profile
+        # over-production is only allowed without the tighter constraints, and
+        # only then are the maximal patterns enough
+        master = backends.masterProblem(self.backend, self.piece_amounts, tight=bool(self.useTight))
+        inventory = self.inventoryRows(master)
+        y = patterns.PatternMatrix(len(self.piece_sizes))
+        types = []
+
+        self.emit('patterns_started', 'Generating all patterns...')
+
+        with profile.phase('patterns'):
+            if self.stock is None:
+                chunks = ((chunk, waste, None) for chunk, waste in patterns.enumeratePatterns(self.piece_sizes, self.stock_length, maximal=not self.useTight, maxWaste=self.maxWaste))
+            else:
+                chunks = self.stockChunks()
+            while not self.stopRequested():
+                with profile.phase('enumerate'):
+                    chunk, waste, k = next(chunks, (None, None, None))
+                if chunk is None:
+                    break
+                with profile.phase('build'):
+                    first = len(y)
+                    y.extend(chunk)
+                    if k is None:
+                        master.addColumns(y, first, waste if self.useLoss else None)
+                    else:
+                        costs = waste if self.useLoss else [self.stock[k].cost] * len(chunk)
+                        master.addColumns(y, first, costs, [[inventory[k]] if k in inventory else []] * len(chunk))
+                        types.extend([k] * len(chunk))
+
+        self.modelSize(master, y)
+        self.emit('patterns_generated', f' Done!\n{master.columns} patterns generated.\n', count=master.columns)
+
+        if self.stopped:
+            # stopped while enumerating
+            master.end()
+            self.fallbackSolution(result)
+            return
+        if not master.columns:
+            master.end()
+            raise ValueError('no pattern is within the waste limit')
+
+        self.emit('ip_started', 'Solving...')
+        with profile.phase('lp'):
+            result.lp_bound = master.solveLP(self.timeLeft())
+        if master.timedOut():
+            result.lp_bound = None
+            self.stop('time limit')
+            self.fallbackSolution(result, master, y)
+            master.end()
+            return
+        if not master.feasible():
+            master.end()
+            raise self.infeasible()
+
+        # the heuristics minimize stock, never over-produce and ignore the
+        # waste limit, so they only stand in for the default model
+        best = None
+        if self.useHeuristics and not self.useLoss and not self.useTight and self.maxWaste is None and self.stock is None:
+            best = self.heuristicSolution(result, master, y)
+            if best.stockUsed() <= lowerBound(result.lp_bound):
+                master.end()
+                self.acceptHeuristic(result, best)
+                self.emit('solved', f' Done!\nZ = {result.objective:.2f} (the {best.name} heuristic reached the LP bound)\n', objective=result.objective)
+                return
+
+        with profile.phase('ip'):
+            result.objective = master.solveIP(self.timeLeft(), self.mipGap)
+        if master.timedOut():
+            self.stop('time limit')
+        if not master.feasible():
+            master.end()
+            if not self.stopped:
+                raise self.infeasible()
+            self.fallbackSolution(result, best=best)
+            return
+        counts = master.primals()
+        master.end()
+
+        used = [j for j, count in enumerate(counts) if round(count)]
+
+        result.patterns = [y.dense(j) for j in used]
+        result.counts = [int(round(counts[j])) for j in used]
+        if types:
+            result.stock_of = [types[j] for j in used]
+        if best is not None and best.stockUsed() < result.objective:
+            self.acceptHeuristic(result, best)
+        self.emit('solved', f' Done!\nZ = {result.objective:.2f}\n', objective=result.objective)
+
+    def stockChunks(self):
+        '''Enumerate the patterns of every stock type in one pass; yields (patterns, waste, type).
+
+        The patterns of all types are the patterns of the longest one with a
+        load that fits the type. One enumeration for the longest length, kept
+        to the loads that are still useful for some type, is split per type:
+        the load must fit, and unless useTight the pattern must be maximal
+        for the type and its trim loss within maxWaste.
+        '''
+        longest = self.stock_length
+        waste_limit = longest if self.useTight else min(self.piece_sizes) - 1
+        if self.maxWaste is not None:
+            waste_limit = min(waste_limit, self.maxWaste)
+        lowest = min(stock.length for stock in self.stock) - waste_limit
+
+        for chunk, waste in patterns.enumeratePatterns(self.piece_sizes, longest, maximal=False, maxWaste=max(0, longest - lowest)):
+            loads = longest - waste
+            for k, stock in enumerate(self.stock):
+                keep = (loads <= stock.length) & (stock.length - loads <= waste_limit)
+                if keep.any():
+                    yield chunk[keep], stock.length - loads[keep], k
+
+    def inventoryRows(self, master):
+        '''Add a row per stock type with a limited inventory; returns {type: row}.'''
+        rows = {}
+        for k, stock in enumerate(self.stock or []):
+            if stock.available is not None:
+                rows[k] = master.addConstraint()
+                master.setBounds(rows[k], None, stock.available)
+        return rows
+
+    def solveCatalogue(self, result):
+        '''Column generation over a stock catalogue (method 2).
+
+        The master starts with one single-length pattern per piece and stock
+        type it fits, plus an artificial column per piece whose cost is above
+        that of any solution, so it is feasible whatever the inventory.
+        Every iteration prices one knapsack per stock type in parallel: a
+        pattern of type k improves when its dual value is above the type's
+        cost minus the dual of its inventory row.
+        '''
+        profile = self.profile
+        n = len(self.piece_sizes)
+        self.emit('patterns_started', 'Starting delayed column generation process...')
+
+        with profile.phase('patterns'):
+            with profile.phase('build'):
+                master = backends.masterProblem(self.backend, self.piece_amounts, tight=bool(self.useTight))
+                inventory = self.inventoryRows(master)
+                big = sum(self.piece_amounts) * max(stock.cost for stock in self.stock) + 1
+                for i in range(n):
+                    master.addColumn([i], [1.0], big)
+                offset = n
+
+                y = patterns.PatternMatrix(n)
+                types = []
+                seen = set()
+
+                def addPatterns(found):
+                    first = len(y)
+                    for k, pattern in found:
+                        if (k, tuple(pattern)) not in seen:
+                            seen.add((k, tuple(pattern)))
+                            y.append(pattern)
+                            types.append(k)
+                    added = types[first:]
+                    master.addColumns(y, first, [self.stock[k].cost for k in added], [[inventory[k]] if k in inventory else [] for k in added])
+                    return len(added)
+
+                initial = []
+                for k, stock in enumerate(self.stock):
+                    for i, size in enumerate(self.piece_sizes):
+                        if size <= stock.length:
+                            pattern = [0] * n
+                            pattern[i] = min(stock.length // size, self.piece_amounts[i]) if self.useTight else stock.length // size
+                            initial.append((k, pattern))
+                addPatterns(initial)
+
+            iteration = 0
+            with futures.ThreadPoolExecutor(max_workers=len(self.stock)) as pool:
+                while not self.stopRequested():
+                    iteration += 1
+                    start = perf_counter()
+                    objective = master.solveLP(self.timeLeft())
+                    if master.timedOut():
+                        self.stop('time limit')
+                        break
+                    lp_seconds = perf_counter() - start
+
+                    duals = master.duals()
+                    limits = [stock.cost - (duals[inventory[k]] if k in inventory else 0.0) for k, stock in enumerate(self.stock)]
+                    found = pool.map(lambda k: pricing.bestPatterns(duals[:n], self.piece_sizes, self.stock[k].length, self.columns), range(len(self.stock)))
+                    # the most negative reduced costs over all types
+                    candidates = sorted((limits[k] - value, k, pattern) for k, best in enumerate(found) for value, pattern in best)
+                    reduced_cost = candidates[0][0]
+                    pricing_seconds = perf_counter() - start - lp_seconds
+
+                    improving = [(k, pattern) for cost, k, pattern in candidates if cost < -1e-4 * max(limits[k], 1.0)][:self.columns]
+                    profile.iteration(iteration=iteration, objective=objective, reduced_cost=reduced_cost, columns=len(y), master_seconds=lp_seconds, pricing_seconds=pricing_seconds)
+                    self.emit('iteration', iteration=iteration, master=objective, patterns=len(y), reduced_cost=reduced_cost, master_seconds=lp_seconds, pricing_seconds=pricing_seconds)
+
+                    if not improving:
+                        break
+                    with profile.phase('build'):
+                        added = addPatterns(improving)
+                    if not added:
+                        self.emit('duplicate_columns', ' (pricing only found known patterns)', iteration=iteration)
+                        break
+                    profile.count('columns_added', added)
+
+            profile.seconds['lp'] = profile.seconds.get('lp', 0) + sum(entry['master_seconds'] for entry in profile.iterations)
+            profile.seconds['pricing'] = profile.seconds.get('pricing', 0) + sum(entry['pricing_seconds'] for entry in profile.iterations)
+            profile.calls['lp'] = profile.calls['pricing'] = len(profile.iterations)
+
+        self.modelSize(master, y)
+        profile.set('iterations', iteration)
+        self.emit('patterns_generated', f' Done!\n{len(y)} patterns generated.\n', count=len(y), iterations=iteration)
+
+        if self.stopped:
+            master.end()
+            raise SolveStopped(f'the solve was stopped ({self.stopped}) before it found a solution')
+
+        # the LP still needs an artificial column: no mix of the stock on hand covers the orders
+        if any(value > 1e-6 for value in master.primals()[:offset]):
+            master.end()
+            raise ValueError('there is not enough stock to cut every piece')
+        result.lp_bound = objective
+        self.emit('lp_solved', f'Z = {result.lp_bound:.2f} is the lowest possible cost.\n', objective=result.lp_bound)
+
+        self.emit('ip_started', 'Solving IP...')
+        with profile.phase('ip'):
+            result.objective = master.solveIP(self.timeLeft(), self.mipGap)
+        if master.timedOut():
+            self.stop('time limit')
+        values = master.primals()
+        feasible = master.feasible()
+        master.end()
+        if not feasible or any(value > 0.5 for value in values[:offset]):
+            # without an incumbent, or with one that still needs an artificial column
+            if self.stopped:
+                raise SolveStopped(f'the solve was stopped ({self.stopped}) before it found a solution')
+            raise ValueError('there is not enough stock to cut every piece')
+        counts = values[offset:]
+        used = [j for j, count in enumerate(counts) if round(count)]
+
+        result.patterns = [y.dense(j) for j in used]
+        result.counts = [int(round(counts[j])) for j in used]
+        result.stock_of = [types[j] for j in used]
+        self.emit('solved', f' Done!\nFound a solution where Z = {result.objective:.2f}\n', objective=result.objective)
+
+    def solveColumnGeneration(self, result, state=None):
+        '''Method 2: column generation, then the IP over the generated patterns.
+
+        Every iteration adds up to `columns` improving patterns, priced at
+        Wentges-smoothed duals (`stabilization` is the weight of the stability
+        center, 0 turns it off). The loop stops once the Farley lower bound
+        proves the rounded up LP bound or is within `gap` (relative) of the
+        master objective; gap=None solves the LP to optimality. With
+        branchAndPrice=True, a gap left after the IP is closed by
+        branchprice.BranchAndPrice (at most nodeLimit nodes).
+        '''
+        profile = self.profile
+        piece_sizes = self.piece_sizes
+        stock_length = self.stock_length
+
+        self.emit('patterns_started', 'Starting delayed column generation process...')
+
+        with profile.phase('patterns'):
+            if state is None:
+                with profile.phase('build'):
+                    state = ColumnGenerationState(piece_sizes, self.piece_amounts, stock_length, self.backend)
+
+                # patterns found by earlier jobs with the same lengths
+                if self.cache is not None:
+                    with profile.phase('build'):
+                        added = state.addPatterns(self.cache.loadPool(piece_sizes, stock_length))
+                    if added:
+                        profile.count('pool_columns', added)
+                        self.emit('pool_loaded', f' {added} cached patterns...', count=added)
+            master = state.master
+            y = state.y
+
+            # Wentges smoothing: price at a mix of the master duals and the
+            # duals that gave the best lower bound so far (the stability center)
+            center = None
+            best_bound = 0.0
+            converged = False
+
+            iteration = 0
+            while not self.stopRequested():
+                iteration += 1
+                start = perf_counter()
+                objective = master.solveLP(self.timeLeft())
+                if master.timedOut():
+                    self.stop('time limit')
+                    break
+                lp_seconds = perf_counter() - start
+
+                ####################################################################
+                # knapsack subproblem: the patterns with the largest dual values
+                state.duals = master.duals()
+                point, found = self.priceColumns(state.duals, center)
+                value = found[0][0]
+                pricing_seconds = perf_counter() - start - lp_seconds
+
+                # Farley bound: point / value is dual feasible, so this is a lower
+                # bound on the LP optimum whichever point was priced
+                bound = dot(point, self.piece_amounts) / max(value, 1.0)
+                if bound > best_bound:
+                    best_bound = bound
+                    center = point
+
+                # the candidates that improve the current master
+                improving = [pattern for _, pattern in found if dot(state.duals, pattern) > 1.0001]
+
+                profile.iteration(iteration=iteration, objective=objective, bound=best_bound, reduced_cost=1 - value, columns=len(y), master_seconds=lp_seconds, pricing_seconds=pricing_seconds)
+                self.emit('iteration', iteration=iteration, master=objective, pricing=value, patterns=len(y), bound=best_bound, reduced_cost=1 - value, master_seconds=lp_seconds, pricing_seconds=pricing_seconds)
+
+                if not improving:
+                    converged = True
+                    break
+
+                if self.gap is not None and (lowerBound(best_bound) >= lowerBound(objective) or objective - best_bound <= self.gap * objective):
+                    self.emit('bound_reached', f' stopping with the lower bound at {best_bound:.2f}...', bound=best_bound)
+                    break
+
+                with profile.phase('build'):
+                    added = state.addPatterns(improving)
+                if not added:
+                    # only patterns the master already has price out, so the LP
+                    # is optimal up to GLPK's tolerances
+                    self.emit('duplicate_columns', ' (pricing only found known patterns)', iteration=iteration)
+                    converged = True
+                    break
+                profile.count('columns_added', added)
+
+            profile.seconds['lp'] = profile.seconds.get('lp', 0) + sum(entry['master_seconds'] for entry in profile.iterations)
+            profile.seconds['pricing'] = profile.seconds.get('pricing', 0) + sum(entry['pricing_seconds'] for entry in profile.iterations)
+            profile.calls['lp'] = profile.calls['pricing'] = len(profile.iterations)
+
+        self.modelSize(master, y)
+        profile.set('iterations', iteration)
+        self.emit('patterns_generated', f' Done!\n{len(y)} patterns generated.\n', count=len(y), iterations=iteration)
+
+        if self.cache is not None:
+            self.cache.storePool(piece_sizes, stock_length, [y.dense(j) for j in range(len(y))])
+
+        # once converged the last master solve is the LP relaxation over all
+        # generated patterns; otherwise only the Farley bound is proven
+        result.lp_bound = objective if converged else best_bound
+        if self.stopped:
+            self.fallbackSolution(result, master, y)
+            return
+        self.emit('lp_solved', f'Z = {result.lp_bound:.2f} so a minimum of {lowerBound(result.lp_bound)} master (stock) pieces are required.\n', objective=result.lp_bound)
+
+        best = None
+        if self.useHeuristics:
+            best = self.heuristicSolution(result, master, y)
+            bound = lowerBound(result.lp_bound)
+            if best.stockUsed() <= bound:
+                self.acceptHeuristic(result, best)
+                self.emit('solved', f'The {best.name} heuristic found a solution where Z = {result.objective:.2f}, which is optimal.\n', objective=result.objective, heuristic=best.name)
+                return
+            self.emit('heuristic', f'The {best.name} heuristic found a solution where Z = {best.stockUsed()} ({best.stockUsed() - bound} above the bound).\n', objective=best.stockUsed(), heuristic=best.name)
+
+        self.emit('ip_started', 'Solving IP...')
+        with profile.phase('ip'):
+            result.objective = master.solveIP(self.timeLeft(), self.mipGap)
+        if master.timedOut():
+            self.stop('time limit')
+        feasible = master.feasible()
+        counts = master.primals()
+        # leave the master ready for the next incremental solve
+        master.relax()
+        if not feasible:
+            self.fallbackSolution(result, best=best)
+            return
+        used = [j for j, count in enumerate(counts) if round(count)]
+
+        result.patterns = [y.dense(j) for j in used]
+        result.counts = [int(round(counts[j])) for j in used]
+
+        # the heuristics may use patterns the IP did not have
+        if best is not None and best.stockUsed() < result.objective:
+            self.acceptHeuristic(result, best)
+        self.emit('solved', f' Done!\nFound a solution where Z = {result.objective:.2f}\n', objective=result.objective)
+
+        if self.branchAndPrice and result.gap() and not self.stopped:
+            self.branch(result, state)
+
+    def solveArcFlow(self, result):
+        '''Method 3: the arc-flow model (arcflow.ArcFlowModel) as a single IP, its flow decoded into patterns.'''
+        profile = self.profile
+        self.emit('patterns_started', 'Building the arc-flow graph...')
+
+        with profile.phase('build'):
+            graph = arcflow.ArcFlowGraph(self.piece_sizes, self.piece_amounts, self.stock_length)
+            model = backends.arcFlowModel(self.backend, graph, self.piece_amounts)
+
+        profile.set('rows', model.rows)
+        profile.set('columns', model.columns)
+        profile.set('nonzeros', model.nonzeros)
+        profile.set('graph_nodes', len(graph.nodes))
+        profile.set('graph_arcs', graph.itemArcs())
+        profile.set('uncompressed_nodes', graph.original_nodes)
+        profile.set('uncompressed_arcs', graph.original_arcs)
+        self.emit('graph_built', f' Done!\n{len(graph.nodes)} nodes and {graph.itemArcs()} arcs ({graph.original_nodes} and {graph.original_arcs} before compression).\n', nodes=len(graph.nodes), arcs=graph.itemArcs())
+
+        if self.stopRequested():
+            model.end()
+            self.fallbackSolution(result)
+            return
+
+        self.emit('ip_started', 'Solving...')
+        with profile.phase('lp'):
+            lp = model.solveLP(self.timeLeft())
+        if model.timedOut():
+            model.end()
+            self.stop('time limit')
+            self.fallbackSolution(result)
+            return
+        result.lp_bound = lp
+
+        best = None
+        if self.useHeuristics:
+            with profile.phase('heuristics'):
+                best = heuristics.bestHeuristic(self.piece_sizes, self.piece_amounts, self.stock_length, bound=lowerBound(result.lp_bound))
+            if best.stockUsed() <= lowerBound(result.lp_bound):
+                model.end()
+                self.acceptHeuristic(result, best)
+                self.emit('solved', f' Done!\nZ = {result.objective:.2f} (the {best.name} heuristic reached the LP bound)\n', objective=result.objective)
+                return
+
+        with profile.phase('ip'):
+            result.objective = model.solveIP(self.timeLeft(), self.mipGap)
+        if model.timedOut():
+            self.stop('time limit')
+        if not model.feasible():
+            model.end()
+            self.fallbackSolution(result, best=best)
+            return
+        result.patterns, result.counts = arcflow.decodeFlows(graph, model.flows())
+        model.end()
+        if best is not None and best.stockUsed() < result.objective:
+            self.acceptHeuristic(result, best)
+        self.emit('solved', f' Done!\nZ = {result.objective:.2f}\n', objective=result.objective)
+
+    def branch(self, result, state):
+        '''Close the remaining gap with branch-and-price, starting from the generated patterns.'''
+        y = state.y
+        incumbent = heuristics.Packing(result.heuristic or 'ip', list(result.patterns), list(result.counts))
+        with self.profile.phase('branching'):
+            tree = BranchAndPrice(self.piece_sizes, self.piece_amounts, self.stock_length, [y.dense(j) for j in range(len(y))], incumbent, self.columns, self.nodeLimit, self.emit, self.stopRequested, self.backend)
+            best, result.bound = tree.solve()
+        self.profile.set('nodes', tree.nodes)
+
+        if best.stockUsed() < result.stockUsed():
+            result.patterns = best.patterns
+            result.counts = best.counts
+            result.objective = float(best.stockUsed())
+            result.heuristic = None
+        # the patterns found in the tree are kept for the next solve
+        state.addPatterns(tree.new_patterns)
+
+    def priceColumns(self, duals, center):
+        '''Solve the pricing knapsack; returns the priced point and its best (value, pattern) pairs.
+
+        With a stability center the smoothed point is tried first. When none
+        of its patterns improve the master (a mis-pricing) the master duals
+        are priced instead.
+        '''
+        if center is not None and self.stabilization:
+            alpha = self.stabilization
+            point = [alpha * c + (1 - alpha) * d for c, d in zip(center, duals)]
+            found = pricing.bestPatterns(point, self.piece_sizes, self.stock_length, self.columns)
+            if any(dot(duals, pattern) > 1.0001 for _, pattern in found):
+                return point, found
+        return duals, pricing.bestPatterns(duals, self.piece_sizes, self.stock_length, self.columns)
+
+    def modelSize(self, master, y):
+        self.profile.set('rows', master.rows)
+        self.profile.set('columns', master.columns)
+        self.profile.set('nonzeros', int(y.nnz))
+
+    def heuristicSolution(self, result, master, y):
+        '''Best heuristic Packing, rounding from the master's current LP solution.'''
+        with self.profile.phase('heuristics'):
+            values = master.primals()
+            support = [j for j, value in enumerate(values) if value > 1e-9]
+            return heuristics.bestHeuristic(self.piece_sizes, self.piece_amounts, self.stock_length, [y.dense(j) for j in support], [values[j] for j in support], lowerBound(result.lp_bound))
+
+    def fallbackSolution(self, result, master=None, y=None, best=None):
+        '''Once a limit hit: the best of first-fit decreasing, rounding the master's LP solution and `best`.
+
+        Packings with a pattern over maxWaste do not count; SolveStopped is
+        raised when none is left (and always with a stock catalogue).
+        '''
+        if self.stock is not None:
+            raise SolveStopped(f'the solve was stopped ({self.stopped}) before it found a solution')
+        with self.profile.phase('heuristics'):
+            candidates = [best, heuristics.firstFitDecreasing(self.piece_sizes, self.piece_amounts, self.stock_length)]
+            if master is not None:
+                values = master.primals()
+                support = [j for j, value in enumerate(values) if value > 1e-9]
+                candidates.append(heuristics.residualRounding(self.piece_sizes, self.piece_amounts, self.stock_length, [y.dense(j) for j in support], [values[j] for j in support]))
+        candidates = [c for c in candidates if c is not None and self.withinWasteLimit(c.patterns)]
+        if not candidates:
+            raise SolveStopped(f'the solve was stopped ({self.stopped}) before it found a solution within the waste limit')
+        packing = min(candidates, key=lambda c: c.stockUsed())
+        self.acceptHeuristic(result, packing)
+        if self.useLoss:
+            result.objective = float(sum(count * (self.stock_length - dot(self.piece_sizes, pattern)) for count, pattern in result.usedPatterns()))
+        self.emit('solved', f' Done!\nStopped early ({self.stopped}), the best solution found ({packing.name}) has Z = {result.objective:.2f}\n', objective=result.objective, heuristic=packing.name)
+
+    def withinWasteLimit(self, patterns):
+        return self.maxWaste is None or all(self.stock_length - dot(self.piece_sizes, pattern) <= self.maxWaste for pattern in patterns)
+
+    def infeasible(self):
+        '''The error for a method 1 model without a feasible solution.'''
+        if self.maxWaste is not None:
+            return ValueError(f'no patterns with at most {self.maxWaste} waste each cut every piece' + ('' if self.stock is None else ' from the stock on hand'))
+        return ValueError('there is not enough stock to cut every piece')
+
+    def acceptHeuristic(self, result, packing):
+        result.patterns = packing.patterns
+        result.counts = packing.counts
+        result.objective = float(packing.stockUsed())
+        result.heuristic = packing.name
+
+
+class ColumnGenerationState:
+    '''Master problem, pattern pool and last duals of a column generation run.
+
+    A SolverSession keeps one alive between solves so the next one starts
+    from the previous basis and patterns. backend is the master's engine
+    (see backends.py).
+    '''
+    def __init__(self, piece_sizes, piece_amounts, stock_length, backend='glpk'):
+        self.piece_sizes = list(piece_sizes)
+        self.piece_amounts = list(piece_amounts)
+        self.stock_length = stock_length
+        self.duals = None
+
+        # generate initial patterns, enough to get a feasible solution
+        self.y = patterns.PatternMatrix(len(piece_sizes))
+        self.y.extend(np.diag([stock_length // size for size in piece_sizes]))
+        self.seen = set(tuple(self.y.dense(j)) for j in range(len(self.y)))
+
+        # the master problem is built once; new patterns are appended as columns
+        self.master = backends.masterProblem(backend, piece_amounts)
+        self.master.addColumns(self.y)
+
+    def addPatterns(self, new_patterns):
+        '''Append the patterns not in the pool yet as columns; returns how many were new.'''
+        first = len(self.y)
+        for pattern in new_patterns:
+            if tuple(pattern) not in self.seen:
+                self.seen.add(tuple(pattern))
+                self.y.append(pattern)
+        self.master.addColumns(self.y, first)
+        return len(self.y) - first
+
+    def setDemand(self, i, amount):
+        if self.piece_amounts[i] != amount:
+            self.piece_amounts[i] = amount
+            self.master.setDemand(i, amount)
+
+    def addPiece(self, size, amount):
+        '''Add a new length: its own pattern plus every existing pattern filled up with it.'''
+        self.piece_sizes.append(size)
+        self.piece_amounts.append(amount)
+        self.y.addRow()
+        self.master.addRow(amount)
+        self.seen = set(pattern + (0,) for pattern in self.seen)
+
+        extended = []
+        loads = self.y.loads(self.piece_sizes)
+        for j in range(len(self.y)):
+            fit = (self.stock_length - int(loads[j])) // size
+            if fit:
+                pattern = self.y.dense(j)
+                pattern[-1] = fit
+                extended.append(pattern)
+        single = [0] * len(self.piece_sizes)
+        single[-1] = self.stock_length // size
+        self.addPatterns([single] + extended)
+
+    def end(self):
+        self.master.end()
+
+
+class SolverSession:
+    '''Keeps the column generation state between solves of an evolving order table.
+
+    When only amounts change, the master problem is re-optimized from its last
+    basis with every pattern found so far; a new length adds a row and extends
+    the existing patterns instead of starting over. Lengths that disappear keep
+    their row with a demand of 0. Method 1, or a change of stock length or
+    options, starts a fresh solve.
+    '''
+    def __init__(self, progress=None, cache=None):
+        self.progress = progress
+        self.cache = cache
+        self.state = None
+        self.options = None
+
+    def reset(self):
+        if self.state is not None:
+            self.state.end()
+        self.state = None
+
+    def solve(self, piece_sizes, piece_amounts, stock_length, method=2, **options):
+        options.setdefault('progress', self.progress)
+        options.setdefault('cache', self.cache)
+        if method != 2 or isCatalogue(stock_length):
+            self.reset()
+            return solve(piece_sizes, piece_amounts, stock_length, method, **options)
+
+        # the state holds the presolved rows; a change of scale starts over
+        fix = options.pop('presolve', True)
+        reduction = presolve.Reduction(piece_sizes, piece_amounts, stock_length, fix=fix, scale=fix and not options.get('useLoss') and options.get('maxWaste') is None)
+        if reduction.empty():
+            self.reset()
+            return solve(piece_sizes, piece_amounts, stock_length, method, presolve=fix, **options)
+
+        orders = list(zip(reduction.piece_sizes, reduction.piece_amounts))
+        backend = options.get('backend', 'glpk')
+        key = (stock_length, reduction.scale, options.get('useLoss'), options.get('useTight'), options.get('maxWaste'), backend)
+        if self.state is None or self.options != key:
+            self.reset()
+            backends.checkBackend(backend)
+            self.state = ColumnGenerationState(reduction.piece_sizes, reduction.piece_amounts, reduction.stock_length, backend)
+            self.options = key
+        else:
+            demand = dict(orders)
+            for i, size in enumerate(self.state.piece_sizes):
+                self.state.setDemand(i, demand.pop(size, 0))
+            for size, amount in demand.items():
+                self.state.addPiece(size, amount)
+
+        try:
+            engine = CuttingStockSolver(self.state.piece_sizes, self.state.piece_amounts, reduction.stock_length, method, presolve=False, **options)
+            result = engine.solve(state=self.state)
+        except BaseException:
+            # an interrupted solve may leave the master in any state
+            self.reset()
+            raise
+
+        # report the result against the rows that were asked for
+        mapped = SolveResult(piece_sizes, piece_amounts, stock_length, method)
+        expandResult(reduction, result, mapped, result.minimize_waste)
+        mapped.stopped_early = result.stopped_early
+        mapped.timings = result.timings
+        mapped.profile = result.profile
+        if reduction.fixed and options['progress'] is not None:
+            options['progress']({'event': 'postsolved', 'message': f'With the {reduction.fixedStock()} stock pieces fixed by presolve Z = {mapped.objective:.2f}\n', 'objective': mapped.objective})
+        return mapped
+
+
+def expandResult(reduction, reduced, result, useLoss=0):
+    '''Fill `result`, a SolveResult over the original orders, from `reduced`,
+    the solution of what a presolve.Reduction left to model.'''
+    fixed = reduction.fixedStock()
+    extra = reduction.fixedWaste(result.stock_length) if useLoss else fixed
+    result.minimize_waste = bool(useLoss)
+    result.patterns, result.counts, result.stock_of = reduction.expand(reduced.patterns, reduced.counts, reduced.piece_sizes, reduced.stock_of)
+    result.objective = reduced.objective + extra
+    result.lp_bound = None if reduced.lp_bound is None else reduced.lp_bound + extra
+    result.bound = None if reduced.bound is None else reduced.bound + fixed
+    # the L2 bound counts stock pieces, so it says nothing about waste
+    if reduction.bound is not None and not useLoss:
+        result.bound = max(result.bound or 0, reduction.bound + fixed)
+    result.heuristic = reduced.heuristic
+    result.cached = reduced.cached
+    return result
+
+
+def solve(piece_sizes, piece_amounts, stock_length, method=1, **options):
+    '''Solve a cutting-stock problem and return a SolveResult.
+
+    options are the keyword arguments of CuttingStockSolver.
+    '''
+    return CuttingStockSolver(piece_sizes, piece_amounts, stock_length, method, **options).solve()
+
+
+def interpretResults(result):
+    return result.solution().summary(show_stock=result.stock is not None)
@@ -0,0 +1,86 @@
+import importlib.util
+import sys
+
+
+# seconds a fresh interpreter may spend importing each entry module; numpy
+# and GLPK are not part of it, they are loaded by the first model
+STARTUP_BUDGET = {
+    'solver': 0.06,
+    'cli': 0.06,
+    'batch': 0.1,
+    'worker': 0.05,
+    'service': 0.15,
+}
+# what a model needs; preload() these where a process can load them early
+MODEL_MODULES = ('numpy', 'pymprog', 'swiglpk')
+
+
+def lazyImport(name):
+    '''The module `name`, executed on its first attribute access.
+
+    The model and array libraries (numpy, pymprog and GLPK) take most of the
+    time a fresh process needs to import the solver; loaded this way they
+    cost nothing until a solve really builds a model, so a cache hit or a
+    heuristic answer never pays for them.
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f'no module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload(*names):
+    '''Import the named modules and load them if they were imported lazily.
+
+    Worker processes do this while they wait for work, and a parent does it
+    before it forks workers, so that no solve waits for numpy or GLPK.
+    '''
+    for name in names:
+        # any attribute access runs a lazily imported module
+        importlib.import_module(name).__name__
+
+
+def importSeconds(module, runs=3):
+    '''Best wall clock time of importing `module` in a fresh interpreter, over `runs` runs.'''
+    # every module imports this one, so what only measuring needs is imported here
+    import subprocess
+    code = f'from time import perf_counter; start = perf_counter(); import {module}; print(perf_counter() - start)'
+    best = None
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        seconds = float(out.stdout.split()[-1])
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Measure how long the entry modules take to import and check them against their startup budget.')
+    parser.add_argument('modules', nargs='*', default=list(STARTUP_BUDGET), help='modules to measure (default: %(default)s)')
+    parser.add_argument('-n', '--runs', type=int, default=3, help='fresh interpreters per module, the best run counts (default: 3)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget, e.g. for slow machines (default: 1)')
+    args = parser.parse_args(argv)
+
+    over = 0
+    for module in args.modules:
+        seconds = importSeconds(module, args.runs)
+        budget = STARTUP_BUDGET.get(module)
+        if budget is None:
+            print(f'{module:10} {seconds * 1000:7.1f} ms')
+            continue
+        budget *= args.scale
+        ok = seconds <= budget
+        over += not ok
+        print(f'{module:10} {seconds * 1000:7.1f} ms  (budget {budget * 1000:.0f} ms{"" if ok else ", OVER"})')
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+class Stock:
+    '''One type of stock in a catalogue: pieces of `length` that cost `cost`
+    each, with `available` of them on hand (None for an unlimited supply).'''
+    def __init__(self, length, cost=1.0, available=None):
+        self.length = int(length)
+        self.cost = float(cost)
+        self.available = None if available is None else int(available)
+        if self.length <= 0 or self.cost < 0 or (self.available is not None and self.available < 0):
+            raise ValueError('stock lengths must be positive, costs and amounts not negative')
+
+    def __repr__(self):
+        return f'Stock({self.length}, {self.cost:g}, {self.available})'
+
+    @classmethod
+    def fromDict(cls, data):
+        '''A Stock from {"length": .., "cost": .., "available": ..}, a [length, cost, available] list or a length.'''
+        if isinstance(data, dict):
+            return cls(data['length'], data.get('cost', 1.0), data.get('available'))
+        if isinstance(data, (list, tuple)):
+            return cls(*data)
+        return cls(data)
+
+    def asDict(self):
+        return {'length': self.length, 'cost': self.cost, 'available': self.available}
+
+
+def isCatalogue(stock_length):
+    return isinstance(stock_length, (list, tuple))
+
+
+def parseCatalogue(text):
+    '''Parse a stock entry such as "6000:12.5:40, 5600:11".
+
+    Every comma separated item is length[:cost[:available]]. A single plain
+    length is returned as an int, anything else as a list of Stock.
+    '''
+    items = [item.strip() for item in text.split(',') if item.strip()]
+    if len(items) == 1 and ':' not in items[0]:
+        return int(items[0])
+    catalogue = []
+    for item in items:
+        fields = [field.strip() for field in item.split(':')]
+        if len(fields) > 3:
+            raise ValueError(f'{item!r} is not length[:cost[:available]]')
+        length = int(fields[0])
+        cost = float(fields[1]) if len(fields) > 1 and fields[1] else 1.0
+        available = int(fields[2]) if len(fields) > 2 and fields[2] else None
+        catalogue.append(Stock(length, cost, available))
+    if not catalogue:
+        raise ValueError('no stock length given')
+    return catalogue
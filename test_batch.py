@@ -0,0 +1,53 @@
+import io
+
+import pytest
+
+import batch
+from stock import Stock
+
+
+def test_result_names():
+    taken = {'summary'}
+    names = [batch.resultName(name, taken) for name in ['a', 'A', '../etc/passwd', 'summary', 'x y', '...', 'a']]
+    assert names == ['a.json', 'A-2.json', '_etc_passwd.json', 'summary-2.json', 'x_y.json', 'job.json', 'a-3.json']
+
+
+@pytest.mark.parametrize('statuses, code', [
+    ([], batch.EXIT_USAGE),
+    (['solved', 'solved'], batch.EXIT_OK),
+    (['solved', 'timeout'], batch.EXIT_TIMEOUT),
+    (['solved', 'timeout', 'failed'], batch.EXIT_FAILED),
+])
+def test_exit_code(statuses, code):
+    assert batch.exitCode([{'status': status} for status in statuses]) == code
+
+
+def test_parse_job_formats():
+    pairs = batch.parseJob('a', {'orders': [[40, 3], {'length': 25, 'amount': 2}], 'stock_length': '100', 'method': 3})
+    assert (pairs.name, pairs.piece_sizes, pairs.piece_amounts, pairs.stock_length, pairs.method) == ('a', [40, 25], [3, 2], 100, 3)
+
+    lists = batch.parseJob('b', {'id': 7, 'sizes': [40], 'amounts': [1]}, stock_length=90)
+    assert (lists.name, lists.stock_length, lists.method) == ('7', 90, None)
+
+    catalogue = batch.parseJob('c', {'sizes': [40], 'amounts': [1], 'stock': [[100, 1.5, 2], {'length': 80}]})
+    assert [(s.length, s.cost, s.available) for s in catalogue.stock_length] == [(100, 1.5, 2), (80, Stock(80).cost, None)]
+
+
+@pytest.mark.parametrize('data, error', [
+    ({'sizes': [40], 'amounts': [1]}, ValueError),
+    ({'orders': [[40]], 'stock_length': 100}, IndexError),
+    ({'orders': [{'length': 40}], 'stock_length': 100}, KeyError),
+    ({'sizes': ['forty'], 'amounts': [1], 'stock_length': 100}, ValueError),
+    ({'amounts': [1], 'stock_length': 100}, KeyError),
+])
+def test_parse_job_errors(data, error):
+    with pytest.raises(error):
+        batch.parseJob('bad', data)
+
+
+def test_read_jobs_reports_bad_lines():
+    stream = io.StringIO('{"sizes": [40], "amounts": [1], "stock_length": 100}\n\nnot json\n{"sizes": [40]}\n')
+    jobs = list(batch.readJobs(['-'], stream=stream))
+    assert [name for name, _ in jobs] == ['stdin-1', 'stdin-3', 'stdin-4']
+    assert isinstance(jobs[0][1], batch.Job)
+    assert all(isinstance(job, Exception) for _, job in jobs[1:])
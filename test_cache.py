@@ -0,0 +1,34 @@
+import os
+
+from cache import SolveCache
+import solver
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = SolveCache(str(tmp_path), max_entries=2)
+    cache.storePool([20, 30], 100, [[2, 2]])
+    cache.storePool([20, 40], 100, [[3, 1]])
+    for age, sizes in enumerate(([20, 30], [20, 40]), 1):
+        path = cache._path('pool', cache.poolKey(sizes, 100))
+        os.utime(path, (age, age))
+
+    # reading an entry makes it the most recently used, so the other one goes
+    assert cache.loadPool([30, 20], 100) == [[2, 2]]
+    cache.storePool([25, 50], 100, [[2, 1]])
+    assert len(os.listdir(str(tmp_path))) == 2
+    assert cache.loadPool([20, 40], 100) == []
+    assert cache.loadPool([20, 30], 100) == [[2, 2]]
+    assert cache.loadPool([25, 50], 100) == [[2, 1]]
+
+
+def test_cache_hit_maps_plan(tmp_path):
+    cache = SolveCache(str(tmp_path))
+    first = solver.solve([7, 60], [7, 6], 100, 1, cache=cache)
+    assert not first.cached
+
+    # the same merged orders, listed in another order and split over two rows
+    result = solver.solve([60, 7, 7], [6, 3, 4], 100, 1, cache=cache)
+    assert result.cached
+    assert result.objective == first.objective
+    produced = [sum(count * pattern[i] for count, pattern in result.usedPatterns()) for i in range(3)]
+    assert produced == [6, 3, 4]
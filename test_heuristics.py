@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+import heuristics
+from presolve import l2Bound
+
+
+def instances(count, seed=3):
+    rng = random.Random(seed)
+    for _ in range(count):
+        stock_length = rng.randint(50, 200)
+        sizes = [rng.randint(5, stock_length) for _ in range(rng.randint(1, 8))]
+        yield sizes, [rng.randint(0, 12) for _ in sizes], stock_length
+
+
+def checkPacking(packing, piece_sizes, piece_amounts, stock_length):
+    assert all(count > 0 for count in packing.counts)
+    for pattern in packing.patterns:
+        assert sum(a * s for a, s in zip(pattern, piece_sizes)) <= stock_length
+    for i, amount in enumerate(piece_amounts):
+        assert sum(count * pattern[i] for count, pattern in zip(packing.counts, packing.patterns)) >= amount
+    assert packing.stockUsed() >= l2Bound(piece_sizes, piece_amounts, stock_length)
+
+
+@pytest.mark.parametrize('piece_sizes, piece_amounts, stock_length', list(instances(25)))
+def test_heuristics_are_feasible(piece_sizes, piece_amounts, stock_length):
+    # an LP-like solution to round: single-piece patterns at fractional values
+    patterns = [[stock_length // size if j == i else 0 for j in range(len(piece_sizes))] for i, size in enumerate(piece_sizes)]
+    values = [amount / pattern[i] for i, (amount, pattern) in enumerate(zip(piece_amounts, patterns))]
+    packings = [
+        heuristics.firstFitDecreasing(piece_sizes, piece_amounts, stock_length),
+        heuristics.residualRounding(piece_sizes, piece_amounts, stock_length, patterns, values),
+        heuristics.sequentialValueCorrection(piece_sizes, piece_amounts, stock_length),
+        heuristics.bestHeuristic(piece_sizes, piece_amounts, stock_length, patterns, values),
+    ]
+    for packing in packings:
+        checkPacking(packing, piece_sizes, piece_amounts, stock_length)
+    assert packings[-1].stockUsed() == min(packing.stockUsed() for packing in packings[:-1])
+
+
+def test_merge_patterns():
+    packing = heuristics.mergePatterns(heuristics.Packing('x', [[1, 0], [0, 2], [1, 0]], [2, 1, 3]))
+    assert sorted(zip(packing.counts, packing.patterns)) == [(1, [0, 2]), (5, [1, 0])]
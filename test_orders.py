@@ -0,0 +1,54 @@
+import csv
+import json
+
+import pytest
+
+import orders
+import solver
+
+
+ROWS = [(2000, 3), (1380, 5), (2000, 4), (950, 0), (1380, 1)]
+MERGED = [(1380, 6), (2000, 7)]
+
+
+def test_merge_orders():
+    assert orders.mergeOrders(ROWS) == MERGED
+    with pytest.raises(ValueError):
+        orders.mergeOrders([(100, -1)])
+
+
+@pytest.mark.parametrize('name', ['orders.csv', 'orders.json'])
+def test_write_read_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    orders.writeOrders(path, ROWS)
+    assert orders.readOrders(path) == MERGED
+
+
+def test_read_formats(tmp_path):
+    (tmp_path / 'bare.csv').write_text('2000,3\n\n1380,5\n2000,4\n')
+    (tmp_path / 'lines.jsonl').write_text('[2000, 3]\n{"length": 1380, "amount": 5}\n\n[2000, 4]\n')
+    (tmp_path / 'job.json').write_text(json.dumps({'sizes': [2000, 1380, 2000], 'amounts': [3, 5, 4], 'stock_length': 5600}))
+    for name in ('bare.csv', 'lines.jsonl', 'job.json'):
+        assert orders.readOrders(str(tmp_path / name)) == [(1380, 5), (2000, 7)]
+
+
+def test_read_errors(tmp_path):
+    (tmp_path / 'bad.csv').write_text('length,amount\n2000,3\n2000,x\n')
+    (tmp_path / 'bad.jsonl').write_text('[2000, 3]\n{"length": 1380}\n')
+    (tmp_path / 'orders.txt').write_text('2000,3\n')
+    for name, message in (('bad.csv', 'line 3'), ('bad.jsonl', 'line 2'), ('orders.txt', 'order files are')):
+        with pytest.raises(ValueError, match=message):
+            orders.readOrders(str(tmp_path / name))
+
+
+def test_write_cut_plan(tmp_path):
+    result = solver.solve([1380, 2000], [6, 7], 5600, 1)
+    path = str(tmp_path / 'plan.csv')
+    orders.writeCutPlan(path, result)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == orders.PLAN_FIELDS
+    cut = {}
+    for row in rows:
+        cut[int(row['length'])] = cut.get(int(row['length']), 0) + int(row['count']) * int(row['amount'])
+    assert cut[1380] >= 6 and cut[2000] >= 7
@@ -0,0 +1,44 @@
+import itertools
+import random
+
+import pytest
+
+import pricing
+
+
+def bruteForce(values, sizes, capacity, bounds=None):
+    '''The value of every feasible pattern of the items worth something, best first.'''
+    ranges = [range(min(capacity // s, capacity if bounds is None else bounds[i]) + 1 if values[i] > 0 else 1) for i, s in enumerate(sizes)]
+    found = [sum(v * z for v, z in zip(values, pattern)) for pattern in itertools.product(*ranges) if sum(s * z for s, z in zip(sizes, pattern)) <= capacity]
+    return sorted(found, reverse=True)
+
+
+def knapsacks(count, seed=2):
+    rng = random.Random(seed)
+    for _ in range(count):
+        capacity = rng.randint(20, 60)
+        sizes = [rng.randint(3, capacity) for _ in range(rng.randint(2, 5))]
+        values = [rng.choice([-0.5, 0.0]) if rng.random() < 0.2 else round(rng.uniform(0.1, 1.0), 3) for _ in sizes]
+        bounds = [rng.randint(0, 4) for _ in sizes] if rng.random() < 0.5 else None
+        yield values, sizes, capacity, bounds
+
+
+@pytest.mark.parametrize('values, sizes, capacity, bounds', list(knapsacks(30)))
+def test_knapsack_matches_brute_force(values, sizes, capacity, bounds):
+    expected = bruteForce(values, sizes, capacity, bounds)
+    # k=1 is solved by dynamic programming, the exact k best by branch-and-bound
+    for k in (1, 3):
+        found = pricing.solveKnapsack(values, sizes, capacity, bounds, k=k)
+        assert len(found) == min(k, len(expected))
+        for (value, pattern), best in zip(found, expected):
+            assert value == pytest.approx(best)
+            assert value == pytest.approx(sum(v * z for v, z in zip(values, pattern)))
+            assert sum(s * z for s, z in zip(sizes, pattern)) <= capacity
+            assert bounds is None or all(z <= b for z, b in zip(pattern, bounds))
+
+
+def test_dp_and_branch_and_bound_agree(monkeypatch):
+    values, sizes, capacity = [0.3, 0.55, 0.7, 0.2], [7, 13, 17, 4], 97
+    value, _ = pricing.bestPattern(values, sizes, capacity)
+    monkeypatch.setattr(pricing, 'DP_CELL_LIMIT', 0)
+    assert pricing.bestPattern(values, sizes, capacity)[0] == pytest.approx(value) == bruteForce(values, sizes, capacity)[0]
@@ -0,0 +1,44 @@
+import pytest
+
+import batch
+from service import SolveService
+
+
+def makeJob(name='job', amounts=(3, 2)):
+    return batch.Job(name, [40, 25], list(amounts), 100)
+
+
+def test_max_waste_needs_method_1():
+    service = SolveService(workers=1)
+    with pytest.raises(ValueError, match='maxWaste'):
+        service.submit(makeJob(), 2, {'maxWaste': 10})
+    entry, created = service.submit(makeJob(), 1, {'maxWaste': 10})
+    assert created and entry.options == {'maxWaste': 10}
+
+
+def test_submit_deduplicates():
+    service = SolveService(workers=1)
+    first, created = service.submit(makeJob())
+    assert created and first.status == 'queued'
+
+    # the same merged orders under another name are the same job
+    again, created = service.submit(batch.Job('other', [25, 40, 40], [2, 1, 2], 100))
+    assert not created and again is first
+    for method, options in ((1, None), (2, {'useTight': 1})):
+        entry, created = service.submit(makeJob(), method, options)
+        assert created and entry is not first
+
+    # a cancelled job no longer answers for its duplicates
+    assert service.cancel(first.id).status == 'cancelled'
+    entry, created = service.submit(makeJob())
+    assert created and entry is not first
+
+
+def test_submit_rejects():
+    service = SolveService(workers=1, max_queue=1, time_limit=5)
+    with pytest.raises(ValueError, match='unknown options: cache, progress'):
+        service.submit(makeJob(), 2, {'progress': print, 'cache': None})
+    entry, _ = service.submit(makeJob(), 2, {'timeLimit': 60})
+    assert entry.options['timeLimit'] == 5
+    with pytest.raises(OverflowError):
+        service.submit(makeJob(amounts=(1, 1)))
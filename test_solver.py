@@ -0,0 +1,161 @@
+import random
+import threading
+
+import pytest
+
+from cache import mapPlan
+import presolve
+import solver
+from stock import Stock
+
+
+DEMO = ([1380, 1520, 1560, 1710, 1820, 1880, 1930, 2000, 2050, 2100, 2140, 2150, 2200], [22, 25, 12, 14, 18, 18, 20, 10, 12, 14, 16, 18, 20], 5600)
+
+
+def randomInstances(count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        stock_length = rng.randint(60, 150)
+        sizes = sorted(set(rng.randint(stock_length // 7, stock_length // 2 + 10) for _ in range(rng.randint(4, 8))))
+        yield sizes, [rng.randint(1, 9) for _ in sizes], stock_length
+
+
+def produced(result):
+    return [sum(count * pattern[i] for count, pattern in result.usedPatterns()) for i in range(len(result.piece_sizes))]
+
+
+def checkPlan(result, piece_sizes, piece_amounts, stock):
+    '''Every row is cut as often as ordered and no pattern is longer than its stock.'''
+    assert all(made >= amount for made, amount in zip(produced(result), piece_amounts))
+    for j, (count, pattern) in enumerate(zip(result.counts, result.patterns)):
+        length = stock if isinstance(stock, int) else stock[result.stock_of[j]].length
+        assert sum(a * s for a, s in zip(pattern, piece_sizes)) <= length
+
+
+@pytest.mark.parametrize('instance', [DEMO] + list(randomInstances(4)))
+def test_methods_agree(instance):
+    piece_sizes, piece_amounts, stock_length = instance
+    objectives = set()
+    for method in (1, 2, 3):
+        result = solver.solve(piece_sizes, piece_amounts, stock_length, method, useHeuristics=False, branchAndPrice=True)
+        checkPlan(result, piece_sizes, piece_amounts, stock_length)
+        objectives.add(result.stockUsed())
+    assert len(objectives) == 1
+
+
+@pytest.mark.parametrize('method', [1, 2, 3])
+def test_presolve_round_trip(method):
+    # duplicate lengths, a zero-demand row, pieces fixed on their own and a common divisor
+    piece_sizes = [1400, 1400, 3000, 5600, 4000, 700, 2100, 700]
+    piece_amounts = [5, 3, 2, 4, 7, 9, 6, 0]
+    plain = solver.solve(piece_sizes, piece_amounts, 5600, method, presolve=False)
+    result = solver.solve(piece_sizes, piece_amounts, 5600, method)
+    assert result.stockUsed() == plain.stockUsed()
+    checkPlan(result, piece_sizes, piece_amounts, 5600)
+    assert produced(result)[7] == 0
+
+
+def test_duplicate_rows_follow_demand():
+    result = solver.solve([7, 7, 60], [0, 7, 6], 100, 1)
+    assert produced(result) == [0, 7, 6]
+
+    plan = mapPlan([(3, [2, 1], 'a')], [7, 60], [7, 60, 7], [1, 3, 4])
+    assert sum(count for count, _, _ in plan) == 3
+    assert all(tag == 'a' for _, _, tag in plan)
+    # rows get their amounts in order, the piece left over goes to the first one
+    totals = [sum(count * pattern[i] for count, pattern, _ in plan) for i in range(3)]
+    assert totals == [2, 3, 4]
+
+    # a length with one row is never split, however far it is overcut
+    assert mapPlan([(3, [1, 3], None)], [64, 22], [64, 17, 22], [3, 0, 8]) == [(3, [1, 0, 3], None)]
+
+
+def checkCatalogue(piece_sizes, piece_amounts, catalogue):
+    '''Method 1 is exact with and without presolve; method 2 only prices columns, so it is feasible but may cost more.'''
+    optimum = solver.solve(piece_sizes, piece_amounts, catalogue, 1, presolve=False).objective
+    for method in (1, 2):
+        result = solver.solve(piece_sizes, piece_amounts, catalogue, method)
+        checkPlan(result, piece_sizes, piece_amounts, catalogue)
+        if method == 1:
+            assert result.objective == pytest.approx(optimum)
+        else:
+            assert result.objective >= optimum - 1e-6
+    return result
+
+
+def test_presolve_catalogue():
+    checkCatalogue([1000, 1000, 2000, 3000], [2, 3, 4, 1], [Stock(6000, 1.2, 2), Stock(4000, 1.0)])
+
+
+@pytest.mark.parametrize('piece_sizes, piece_amounts, catalogue', [
+    ([77], [1], [Stock(75), Stock(83), Stock(84)]),
+    ([1000, 2000, 3000], [1, 1, 1], [Stock(500), Stock(6000)]),
+])
+def test_catalogue_shorter_than_scale(piece_sizes, piece_amounts, catalogue):
+    reduction = presolve.Reduction(piece_sizes, piece_amounts, catalogue)
+    assert all(stock.length > 0 for stock in reduction.stock_length)
+    result = checkCatalogue(piece_sizes, piece_amounts, catalogue)
+    # stock_of still indexes the original catalogue, without the unusable types
+    assert all(catalogue[k].length >= min(piece_sizes) for k in result.stock_of)
+
+
+def test_max_waste():
+    piece_sizes, piece_amounts, stock_length = DEMO
+    result = solver.solve(piece_sizes, piece_amounts, stock_length, 1, maxWaste=50)
+    checkPlan(result, piece_sizes, piece_amounts, stock_length)
+    assert all(stock_length - sum(a * s for a, s in zip(pattern, piece_sizes)) <= 50 for _, pattern in result.usedPatterns())
+    for method in (2, 3):
+        with pytest.raises(ValueError, match='maxWaste'):
+            solver.solve(piece_sizes, piece_amounts, stock_length, method, maxWaste=50)
+
+
+@pytest.mark.parametrize('method', [1, 2])
+def test_catalogue_short_of_stock(method):
+    with pytest.raises(ValueError, match='not enough stock'):
+        solver.solve([1000, 2000], [5, 5], [Stock(3000, 1.0, 2)], method)
+
+
+def test_presolve_keeps_unordered_rows_for_waste():
+    # with useLoss a piece nobody ordered still fills up a pattern
+    plain = solver.solve([64, 17, 22], [3, 0, 8], 83, 1, useLoss=1, presolve=False)
+    result = solver.solve([64, 17, 22], [3, 0, 8], 83, 1, useLoss=1)
+    assert result.objective == pytest.approx(plain.objective) == 6
+    checkPlan(result, [64, 17, 22], [3, 0, 8], 83)
+
+
+def test_session_edits_match_fresh_solves():
+    piece_sizes, piece_amounts, stock_length = list(DEMO[0]), list(DEMO[1]), DEMO[2]
+    session = solver.SolverSession()
+    edits = [
+        (piece_sizes, piece_amounts),
+        (piece_sizes, [amount + 3 * (i % 2) for i, amount in enumerate(piece_amounts)]),
+        (piece_sizes + [1100], piece_amounts + [9]),
+        (piece_sizes[1:] + [1100], piece_amounts[1:] + [9]),
+    ]
+    state = None
+    for sizes, amounts in edits:
+        result = session.solve(sizes, amounts, stock_length, branchAndPrice=True)
+        checkPlan(result, sizes, amounts, stock_length)
+        fresh = solver.solve(sizes, amounts, stock_length, 2, branchAndPrice=True)
+        assert result.stockUsed() == fresh.stockUsed()
+        # every edit continues from the same column generation state
+        assert state is None or session.state is state
+        state = session.state
+    assert state is not None
+    session.reset()
+
+
+@pytest.mark.parametrize('method', [1, 2, 3])
+@pytest.mark.parametrize('limit', ['cancel', 'timeLimit'])
+def test_limits_stop_early(method, limit):
+    piece_sizes, piece_amounts, stock_length = DEMO
+    cancel = threading.Event()
+    cancel.set()
+    options = {'cancel': cancel} if limit == 'cancel' else {'timeLimit': 1e-6}
+    result = solver.solve(piece_sizes, piece_amounts, stock_length, method, **options)
+    assert result.stopped_early
+    checkPlan(result, piece_sizes, piece_amounts, stock_length)
+    assert result.bound is None or result.bound <= result.stockUsed()
+
+    with pytest.raises(solver.SolveStopped):
+        solver.solve([1000, 2000], [5, 5], [Stock(6000), Stock(4000, 0.8)], min(method, 2), **options)
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import queue
+import signal
+from time import perf_counter
+
+
+# seconds a cancelled solve gets to return its best solution before its process is killed
+CANCEL_GRACE = 3.0
+
+
+def serve(requests, events, cancel, incremental=True, cache_dir=None, quiet=False):
+    '''Worker process entry point: solve the requests one by one and report through events.
+
+    With incremental=True one SolverSession lives as long as the process, so
+    consecutive solves of an edited order table still start from the
+    previous patterns; otherwise every request is solved on its own.
+    cache_dir is the solution cache (None for the default directory). With
+    quiet=True the GLPK log is discarded instead of going to the console.
+    '''
+    # Ctrl+C reaches the whole process group; the parent decides when this process ends
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if quiet:
+        # GLPK writes its log straight to the C-level stdout
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+    import profiling
+    import solver
+    from cache import SolveCache
+    import startup
+    # load numpy and GLPK now, while the first request is still being made
+    startup.preload(*startup.MODEL_MODULES)
+
+    try:
+        cache = SolveCache(cache_dir) if cache_dir else SolveCache()
+    except OSError:
+        cache = None
+    session = solver.SolverSession(progress=events.put, cache=cache)
+    if incremental:
+        solve = session.solve
+    else:
+        def solve(*args, **options):
+            return solver.solve(*args, progress=events.put, cache=cache, **options)
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        args, options = request
+        try:
+            result = solve(*args, cancel=cancel, **options)
+            text = solver.interpretResults(result) + f'Took {result.timings["total"]:.3f} seconds.'
+            if profiling.summary(result.profile):
+                text += f' ({profiling.summary(result.profile)})'
+            events.put({'event': 'result', 'message': text, 'result': result.asDict()})
+        except solver.SolveStopped:
+            events.put({'event': 'failed', 'message': '\n\nSolving stopped!\n', 'stopped': True})
+        except Exception as e:
+            events.put({'event': 'failed', 'message': f'\n{e}\n', 'stopped': False})
+    session.reset()
+
+
+class SolverWorker:
+    '''A solver in its own process, driven through queues.
+
+    solve() hands a job to the process and events() drains what it reported
+    since the last call (progress events, then one 'result' or 'failed'
+    event), so a GUI can poll it from its main loop. cancel() first asks the
+    solver to stop at its next checkpoint; a solve that is still running
+    CANCEL_GRACE seconds later (e.g. inside GLPK) is ended by killing the
+    process, and the next solve starts a fresh one. incremental, cache_dir
+    and quiet are passed on to serve.
+    '''
+    def __init__(self, incremental=True, cache_dir=None, quiet=False):
+        self.incremental = incremental
+        self.cache_dir = cache_dir
+        self.quiet = quiet
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.busy = False
+        self.cancelled = None
+
+    def start(self):
+        self.request_queue = self.context.Queue()
+        self.event_queue = self.context.Queue()
+        self.cancel_event = self.context.Event()
+        self.process = self.context.Process(target=serve, args=(self.request_queue, self.event_queue, self.cancel_event, self.incremental, self.cache_dir, self.quiet), daemon=True)
+        self.process.start()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def solve(self, piece_sizes, piece_amounts, stock_length, method=1, **options):
+        if not self.alive():
+            self.start()
+        self.cancel_event.clear()
+        self.cancelled = None
+        self.busy = True
+        self.request_queue.put(((piece_sizes, piece_amounts, stock_length, method), options))
+
+    def events(self, limit=500):
+        '''The events reported since the last call (at most limit of them).
+
+        A worker that died or outlived its cancel grace period ends the
+        solve with a 'failed' event.
+        '''
+        events = []
+        while self.busy and len(events) < limit:
+            try:
+                event = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event['event'] in ('result', 'failed'):
+                self.busy = False
+            events.append(event)
+
+        if self.busy and len(events) < limit:
+            if self.cancelled is not None and perf_counter() - self.cancelled > CANCEL_GRACE:
+                self.kill()
+                events.append({'event': 'failed', 'message': '\n\nSolving stopped!\n', 'stopped': True})
+            elif not self.alive():
+                self.kill()
+                events.append({'event': 'failed', 'message': '\n\nThe solver process exited unexpectedly.\n', 'stopped': False})
+        return events
+
+    def cancel(self):
+        if self.busy and self.cancelled is None:
+            self.cancel_event.set()
+            self.cancelled = perf_counter()
+
+    def kill(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+        self.process = None
+        self.busy = False
+
+    def close(self):
+        if self.alive() and not self.busy:
+            self.request_queue.put(None)
+            self.process.join(1.0)
+        self.kill()